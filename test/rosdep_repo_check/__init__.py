@@ -25,24 +25,39 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+from array import array
+from bz2 import BZ2File
+from contextvars import ContextVar
 from gzip import GzipFile
 from lzma import LZMAFile
+import os
 import socket
 import sys
+import tempfile
 import time
 try:
     from urllib.error import HTTPError
     from urllib.error import URLError
-    from urllib.request import Request
-    from urllib.request import urlopen
 except ImportError:
     from urllib2 import HTTPError
-    from urllib2 import Request
     from urllib2 import URLError
-    from urllib2 import urlopen
 
 from zstandard import ZstdDecompressor
 
+from .cache import get_http_cache
+from .cache import open_spooled
+from .download import spool_response
+from .pipeline import is_pipelining_enabled
+from .pipeline import open_pipelined
+from .session import get_session
+from .snapshot import get_snapshot_max_age
+from .snapshot import get_snapshot_path
+from .snapshot import load_snapshot
+from .snapshot import write_snapshot
+
+
+_current_cache = ContextVar('current_cache', default=None)
+
 
 class SkipPlatform(Exception):
 
@@ -66,6 +81,16 @@ def is_probably_gzip(response):
             response.getheader('Content-Type') == 'application/x-gzip')
 
 
+def is_probably_bz2(response):
+    """
+    Determine if a urllib response is likely bzip2'd.
+
+    :param response: the urllib response
+    """
+    return (response.url.endswith('.bz2') or
+            response.getheader('Content-Type') == 'application/x-bzip2')
+
+
 def is_probably_lzma(response):
     """
     Determine if a urllib response is likely lzma'd.
@@ -89,51 +114,175 @@ def is_probably_zstd(response):
             response.getheader('Content-Type') == 'application/zstd')
 
 
+_DECOMPRESSORS = {
+    'gz': lambda f: GzipFile(fileobj=f, mode='rb'),
+    'bz2': lambda f: BZ2File(f, mode='rb'),
+    'xz': lambda f: LZMAFile(f, mode='rb'),
+    'zst': lambda f: ZstdDecompressor().stream_reader(f),
+}
+
+
+_USER_AGENT = 'rosdep_repo_check/1.0'
+
+
 def open_gz_url(url, retry=2, retry_period=1, timeout=10):
     return open_compressed_url(url, retry, retry_period, timeout)
 
 
-def open_compressed_url(url, retry=2, retry_period=1, timeout=10):
+def open_url(
+    url, retry=2, retry_period=1, timeout=10, sha256=None, resumable=False,
+):
     """
-    Open a URL to a possibly compressed file.
+    Open a URL, revalidating any previously cached content.
+
+    If the persistent HTTP cache is enabled and holds content for the URL, a
+    conditional request is made and the cached content is returned if the
+    server reports that it has not been modified. Otherwise, the content is
+    streamed from the server and added to the cache as it is read.
 
     :param url: URL to the file.
     :param retry: number of times to re-attempt the download.
     :param retry_period: number of seconds to wait between retry attempts.
     :param timeout: number of seconds to wait for the remote host to respond.
-
-    :returns: file-like object for streaming file data.
+    :param sha256: the expected SHA256 digest of the file, if known. Cached
+      content with this digest is returned without making any request, and
+      downloaded content is verified against it.
+    :param resumable: whether to download the whole file to a temporary file
+      before returning, resuming the transfer if it fails part way. The size
+      and digest of the file are verified before it is returned.
+
+    :returns: response-like object for streaming raw file data.
     """
-    request = Request(url, headers={
-        'User-Agent': 'rosdep_repo_check/1.0',
-    })
+    current_cache = _current_cache.get()
+    if current_cache is not None:
+        current_cache.fetches.append((url, time.time()))
+    http_cache = get_http_cache()
+    if http_cache and sha256:
+        f = http_cache.open_digest(sha256, url)
+        if f is not None:
+            return f
+    cached = http_cache.lookup(url) if http_cache else None
+    if cached and sha256 and cached['sha256'] != sha256:
+        # The cached content is known to be outdated
+        cached = None
+    headers = {
+        'User-Agent': _USER_AGENT,
+    }
+    if cached:
+        if 'ETag' in cached['headers']:
+            headers['If-None-Match'] = cached['headers']['ETag']
+        if 'Last-Modified' in cached['headers']:
+            headers['If-Modified-Since'] = cached['headers']['Last-Modified']
     try:
-        f = urlopen(request, timeout=timeout)
+        f = get_session().open(url, headers, timeout)
     except HTTPError as e:
+        if e.code == 304 and cached:
+            e.close()
+            return http_cache.open(cached)
         if e.code == 503 and retry:
             time.sleep(retry_period)
-            return open_gz_url(
+            return open_url(
                 url, retry=retry - 1, retry_period=retry_period,
-                timeout=timeout)
+                timeout=timeout, sha256=sha256, resumable=resumable)
         e.msg += ' (%s)' % url
         raise
     except URLError as e:
         if isinstance(e.reason, socket.timeout) and retry:
             time.sleep(retry_period)
-            return open_gz_url(
+            return open_url(
                 url, retry=retry - 1, retry_period=retry_period,
-                timeout=timeout)
+                timeout=timeout, sha256=sha256, resumable=resumable)
         raise URLError(str(e) + ' (%s)' % url)
-    if is_probably_gzip(f):
-        return GzipFile(fileobj=f, mode='rb')
-    elif is_probably_lzma(f):
-        return LZMAFile(f, mode='rb')
-    elif is_probably_zstd(f):
-        dctx = ZstdDecompressor()
-        return dctx.stream_reader(f)
+    if resumable:
+        return _spool_url(
+            url, f, http_cache, retry, retry_period, timeout, sha256)
+    if http_cache:
+        return http_cache.wrap(url, f, sha256)
     return f
 
 
+def _spool_url(
+    url, response, http_cache, retry, retry_period, timeout, sha256,
+):
+    tmp_dir = http_cache.tmp_dir if http_cache else None
+    if tmp_dir:
+        os.makedirs(tmp_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as dst:
+            digest = spool_response(
+                url, response, dst, {'User-Agent': _USER_AGENT},
+                timeout=timeout, retry=retry, retry_period=retry_period)
+        if sha256 and digest != sha256:
+            raise RuntimeError(
+                "SHA256 mismatch for '%s': expected %s but got %s" % (
+                    url, sha256, digest))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    if http_cache:
+        return http_cache.add(url, response, tmp_path, digest)
+    return open_spooled(tmp_path, response, digest)
+
+
+def open_compressed_url(
+    url, retry=2, retry_period=1, timeout=10, compression=None, sha256=None,
+    pipelined=None, resumable=False,
+):
+    """
+    Open a URL to a possibly compressed file.
+
+    :param url: URL to the file.
+    :param retry: number of times to re-attempt the download.
+    :param retry_period: number of seconds to wait between retry attempts.
+    :param timeout: number of seconds to wait for the remote host to respond.
+    :param compression: the compression of the file ('gz', 'bz2', 'xz', 'zst'
+      or an empty string for none), or None to detect it from the response.
+    :param sha256: the expected SHA256 digest of the raw file, if known.
+    :param pipelined: whether to download and decompress the file on
+      background threads, or None to use the ROSDEP_REPO_CHECK_PIPELINE
+      environment variable.
+    :param resumable: whether to download the whole file before returning,
+      resuming the transfer if it fails part way.
+
+    :returns: file-like object for streaming file data.
+    """
+    f = open_url(url, retry, retry_period, timeout, sha256, resumable)
+    return decompress_response(f, compression, pipelined)
+
+
+def decompress_response(f, compression=None, pipelined=None):
+    """
+    Wrap a response to a possibly compressed file in a decompressing stream.
+
+    :param f: the response returned by open_url().
+    :param compression: the compression of the file ('gz', 'bz2', 'xz', 'zst'
+      or an empty string for none), or None to detect it from the response.
+    :param pipelined: whether to download and decompress the file on
+      background threads, or None to use the ROSDEP_REPO_CHECK_PIPELINE
+      environment variable.
+
+    :returns: file-like object for streaming file data.
+    """
+    if compression is None:
+        if is_probably_gzip(f):
+            compression = 'gz'
+        elif is_probably_bz2(f):
+            compression = 'bz2'
+        elif is_probably_lzma(f):
+            compression = 'xz'
+        elif is_probably_zstd(f):
+            compression = 'zst'
+    decompress = _DECOMPRESSORS.get(compression)
+    if decompress is None:
+        return f
+    if pipelined is None:
+        pipelined = is_pipelining_enabled()
+    if pipelined:
+        return open_pipelined(f, decompress)
+    return decompress(f)
+
+
 class PackageEntry(str):
     """Lightweight data bag for information about an entry in a repository."""
 
@@ -149,6 +298,133 @@ class PackageEntry(str):
         return obj
 
 
+class PackageTable:
+    """
+    Compact storage for the package entries of a repository.
+
+    Names, versions and source names are interned in a shared string pool, and
+    each entry is stored as a row of integer offsets into that pool. Package
+    URLs are split into a directory, which is also interned, and a file name,
+    which is stored in a single encoded buffer. PackageEntry instances are only
+    created when a row is accessed.
+
+    Entries for virtual packages, which are provided by a binary package with
+    a different name, are indexed separately from the entries for binary
+    packages. Only the first entry with each name is stored in each index, and
+    the binary package takes precedence when a name is present in both.
+    Iterating over the table yields the entries from both indexes, so a name
+    may be yielded twice.
+    """
+
+    def __init__(self):
+        self._strings = []
+        self._string_ids = {}
+        self._name_rows = array('i')
+        self._virtual_rows = array('i')
+        self._names = array('i')
+        self._versions = array('i')
+        self._url_dirs = array('i')
+        self._url_files = bytearray()
+        self._url_file_ends = array('I')
+        self._source_names = array('i')
+        self._binary_names = array('i')
+
+    def __len__(self):
+        return len(self._names)
+
+    def __iter__(self):
+        for row in range(len(self._names)):
+            yield self._entry(row)
+
+    def __contains__(self, name):
+        return self._find(name) >= 0
+
+    def _intern(self, value):
+        if value is None:
+            return -1
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            # Store a plain str to avoid retaining any PackageEntry instances
+            value = str.__str__(value)
+            string_id = len(self._strings)
+            self._strings.append(value)
+            self._string_ids[value] = string_id
+            self._name_rows.append(-1)
+            self._virtual_rows.append(-1)
+        return string_id
+
+    def _find(self, name):
+        string_id = self._string_ids.get(name)
+        if string_id is None:
+            return -1
+        row = self._name_rows[string_id]
+        if row < 0:
+            row = self._virtual_rows[string_id]
+        return row
+
+    def _entry(self, row):
+        strings = self._strings
+        name = strings[self._names[row]]
+        version_id = self._versions[row]
+        url_dir_id = self._url_dirs[row]
+        url = None
+        if url_dir_id >= 0:
+            start = self._url_file_ends[row - 1] if row else 0
+            url = strings[url_dir_id] + self._url_files[
+                start:self._url_file_ends[row]].decode('utf-8')
+        source_name_id = self._source_names[row]
+        binary_name_id = self._binary_names[row]
+        return PackageEntry(
+            name,
+            strings[version_id] if version_id >= 0 else None,
+            url,
+            strings[source_name_id] if source_name_id >= 0 else None,
+            strings[binary_name_id] if binary_name_id >= 0 else None)
+
+    def add(self, pkg):
+        """
+        Add a package entry to the table.
+
+        :param pkg: the package entry to add.
+
+        :returns: False if an entry with the same name is already present in
+          the same index.
+        """
+        name_id = self._intern(pkg.name)
+        if pkg.binary_name == pkg.name:
+            rows = self._name_rows
+        else:
+            rows = self._virtual_rows
+        if rows[name_id] >= 0:
+            return False
+        rows[name_id] = len(self._names)
+        self._names.append(name_id)
+        self._versions.append(self._intern(pkg.version))
+        if pkg.url is None:
+            self._url_dirs.append(-1)
+        else:
+            url_dir, sep, url_file = pkg.url.rpartition('/')
+            self._url_dirs.append(self._intern(url_dir + sep))
+            self._url_files += url_file.encode('utf-8')
+        self._url_file_ends.append(len(self._url_files))
+        self._source_names.append(self._intern(pkg.source_name))
+        self._binary_names.append(self._intern(pkg.binary_name))
+        return True
+
+    def get(self, name):
+        """
+        Get a package entry by name.
+
+        :param name: the name of the package.
+
+        :returns: the package entry, or None if no such entry is present.
+        """
+        row = self._find(name)
+        if row < 0:
+            return None
+        return self._entry(row)
+
+
 class RepositoryCache:
     """
     A cache of packages in a repository.
@@ -158,23 +434,136 @@ class RepositoryCache:
     methods for testing if a package is present and also enumeration that
     can be performed multiple times without querying the source multiple
     times.
+
+    The source may also be an index which provides its own lookup() method,
+    such as a Snapshot, in which case lookups are delegated to it directly.
+    A source function can also yield such an index as its first item, if it
+    can only determine whether an index is available once it has started.
     """
 
-    def __init__(self, iterator):
-        self._cache = set()
+    def __init__(self, iterator, on_complete=None, open_snapshot=None):
+        self._cache = PackageTable()
+        self._index = None
+        if hasattr(iterator, 'lookup'):
+            self._index, iterator = iterator, None
         self._source_iterator = iterator
+        self._source_error = None
+        self._on_complete = on_complete
+        self._open_snapshot = open_snapshot
+        self.fetches = []
+        self.validator = None
 
     def __iter__(self):
         return self._enumerate_packages()
 
     def __contains__(self, needle):
-        if needle in self._cache:
-            return True
+        return self.lookup(needle) is not None
+
+    def _is_resolved(self, pkg):
+        # A virtual package is only the final answer for its name once the
+        # source can no longer yield a binary package with the same name
+        return pkg.binary_name == pkg.name or self._source_iterator is None
+
+    def lookup(self, name):
+        """
+        Look up a package by name.
+
+        Packages which have already been enumerated are found using the cache,
+        and the source is only consulted if it has not yet been exhausted.
+
+        :param name: the name of the package to look up.
+
+        :returns: the first package entry with the given name, or None. The
+          entry for a binary package takes precedence over that for a virtual
+          package with the same name.
+        """
+        if self._index is not None:
+            return self._index.lookup(name)
+        found = self._cache.get(name)
+        if found is not None and self._is_resolved(found):
+            return found
         for pkg in self._enumerate_from_source():
-            if pkg == needle:
-                return True
+            if pkg == name:
+                if pkg.binary_name == pkg.name:
+                    return pkg
+                if found is None:
+                    found = pkg
+        if self._index is not None:
+            return self._index.lookup(name)
+        return found
+
+    def lookup_many(self, names):
+        """
+        Look up several packages by name.
+
+        The source is streamed at most once for all of the names which are not
+        already cached, and streaming stops as soon as every name is resolved.
 
-        return False
+        :param names: the names of the packages to look up.
+
+        :returns: a mapping of the names which were found to the first package
+          entry with each name, with the same precedence as lookup().
+        """
+        found = {}
+        remaining = set()
+        for name in names:
+            if self._index is not None:
+                pkg = self._index.lookup(name)
+            else:
+                pkg = self._cache.get(name)
+            if pkg is not None:
+                found[name] = pkg
+            if pkg is None or (
+                    self._index is None and not self._is_resolved(pkg)):
+                remaining.add(name)
+        if remaining:
+            for pkg in self._enumerate_from_source():
+                if pkg in remaining:
+                    if pkg.binary_name != pkg.name:
+                        # Keep looking for a binary package with the name
+                        found.setdefault(pkg.name, pkg)
+                        continue
+                    found[pkg.name] = pkg
+                    remaining.remove(pkg)
+                    if not remaining:
+                        break
+        if remaining and self._index is not None:
+            for name in remaining:
+                pkg = self._index.lookup(name)
+                if pkg is not None:
+                    found[name] = pkg
+        return found
+
+    def prefetch(self):
+        """
+        Enumerate all of the packages in the source and add them to the cache.
+
+        If the source raises an exception, it is not raised here. It will be
+        raised by the next attempt to enumerate the packages instead.
+        """
+        try:
+            for _ in self._enumerate_from_source():
+                pass
+        except Exception:
+            pass
+
+    def open_validated_snapshot(self, validator):
+        """
+        Open the snapshot of this repository if its metadata is unchanged.
+
+        The validator is also recorded, so that it is stored with the
+        snapshot written once the repository has been fully enumerated.
+
+        :param validator: a string which changes whenever the repository
+          metadata changes, such as its checksum.
+
+        :returns: the Snapshot instance, or None if there is no snapshot with
+          the same validator.
+        """
+        self.validator = validator
+        if self._open_snapshot is None:
+            return None
+        return self._open_snapshot(validator)
 
     def _enumerate_from_source(self):
         """
@@ -182,15 +571,34 @@ class RepositoryCache:
 
         When the source has no more packages to yield, this function will also
         no longer yield any packages. As this function yields packages, they
-        are added to the cache.
+        are added to the cache. If the source raised an exception, the same
+        exception is raised again rather than treating the source as complete.
+        If the source yields an index, enumeration stops and the index is used
+        for all subsequent lookups.
         """
+        if self._source_error is not None:
+            raise self._source_error
         while self._source_iterator:
+            token = _current_cache.set(self)
             try:
                 val = next(self._source_iterator)
-                self._cache.add(val)
-                yield val
             except StopIteration:
                 self._source_iterator = None
+                if self._on_complete is not None:
+                    self._on_complete(self)
+                break
+            except Exception as e:
+                self._source_iterator = None
+                self._source_error = e
+                raise
+            finally:
+                _current_cache.reset(token)
+            if hasattr(val, 'lookup'):
+                self._index = val
+                self._source_iterator = None
+                break
+            self._cache.add(val)
+            yield val
 
     def _enumerate_packages(self):
         """
@@ -198,9 +606,16 @@ class RepositoryCache:
 
         Begin by enumerating any previously enumerated and cached packages, then
         attempt to enumerate any addition packages directly from the source.
+        A name may be enumerated more than once, such as for a binary package
+        and a virtual package.
         """
+        if self._index is not None:
+            yield from self._index
+            return
         yield from self._cache
         yield from self._enumerate_from_source()
+        if self._index is not None:
+            yield from self._index
 
 
 class RepositoryCacheCollection:
@@ -211,11 +626,16 @@ class RepositoryCacheCollection:
     OS, version, and arch, which are all associated with the same basic URL.
     It will create repository caches as necessary to meet enumeration
     requests, and will maintain the caches until the instance is deleted.
+
+    If the collection is given a key which uniquely identifies it, each
+    fully enumerated repository is written to a snapshot file, which can be
+    used by subsequent runs instead of enumerating the repository again.
     """
 
-    def __init__(self, iterator):
+    def __init__(self, iterator, key=None):
         self._cache = {}
         self._iterator = iterator
+        self._key = key
 
     def enumerate_packages(self, os_name, os_code_name, os_arch):
         """
@@ -228,11 +648,77 @@ class RepositoryCacheCollection:
         :returns: An enumerable cache of the packages.
         """
         cache = self._cache.get((os_name, os_code_name, os_arch))
-        if not cache:
-            cache = RepositoryCache(self._iterator(os_name, os_code_name, os_arch))
+        if cache is None:
+            snapshot = self._open_snapshot(os_name, os_code_name, os_arch)
+            if snapshot is not None:
+                cache = RepositoryCache(snapshot)
+            else:
+                cache = RepositoryCache(
+                    self._iterator(os_name, os_code_name, os_arch),
+                    on_complete=self._snapshot_writer(
+                        os_name, os_code_name, os_arch),
+                    open_snapshot=lambda validator: self._open_snapshot(
+                        os_name, os_code_name, os_arch, validator))
             self._cache[(os_name, os_code_name, os_arch)] = cache
         return cache
 
+    def _open_snapshot(self, os_name, os_code_name, os_arch, validator=None):
+        if not self._key:
+            return None
+        snapshot = load_snapshot(
+            get_snapshot_path(self._key, os_name, os_code_name, os_arch),
+            self._key, get_snapshot_max_age(), validator)
+        if snapshot is None:
+            return None
+        print('Using snapshot of %s for %s on %s' % (
+            self._key, fmt_os(os_name, os_code_name), os_arch))
+        return snapshot
+
+    def _snapshot_writer(self, os_name, os_code_name, os_arch):
+        if not self._key:
+            return None
+        path = get_snapshot_path(self._key, os_name, os_code_name, os_arch)
+        if not path:
+            return None
+
+        def write(cache):
+            # A snapshot without a validator can only be used based on its
+            # age, which is disabled by default
+            if cache.validator is None and get_snapshot_max_age() <= 0:
+                return
+            try:
+                write_snapshot(path, cache, {
+                    'key': self._key,
+                    'platform': [os_name, os_code_name, os_arch],
+                    'sources': cache.fetches,
+                    'validator': cache.validator,
+                })
+            except OSError as e:
+                print("Failed to write snapshot '%s': %s" % (path, str(e)))
+
+        return write
+
+
+def open_validated_snapshot(validator):
+    """
+    Open the snapshot of the repository being enumerated, if it is unchanged.
+
+    This is intended to be called by source functions once they have read a
+    checksum or similar validator of the repository metadata. If the snapshot
+    was built from metadata with the same validator, the source can yield it
+    instead of enumerating the packages again.
+
+    :param validator: a string which changes whenever the repository metadata
+      changes.
+
+    :returns: the Snapshot instance, or None if there is no snapshot with the
+      same validator or no repository is being enumerated.
+    """
+    current_cache = _current_cache.get()
+    if current_cache is None:
+        return None
+    return current_cache.open_validated_snapshot(validator)
+
 
 def summarize_broken_packages(broken):
     """
@@ -257,6 +743,31 @@ def summarize_broken_packages(broken):
         for platform, pkg_msgs in sorted(grouped.items()))
 
 
+def get_sources(config, os_name, os_code_name, warn=True):
+    """
+    Get the repository collections configured for the given OS version.
+
+    :param config: the parsed YAML configuration.
+    :param os_name: the name of the OS.
+    :param os_code_name: the OS version.
+    :param warn: whether to print a warning if the OS version has no sources.
+
+    :returns: the repository collections, in the order they should be searched.
+    """
+    sources = []
+    for os_sources in config['package_sources'].get(os_name, ()):
+        if isinstance(os_sources, dict):
+            os_sources = os_sources.get(os_code_name, [])
+        else:
+            os_sources = [os_sources]
+        if not os_sources and warn:
+            print(
+                'WARNING: No sources for %s' % (fmt_os(os_name, os_code_name)),
+                 file=sys.stderr)
+        sources.extend(os_sources)
+    return sources
+
+
 def find_package(config, pkg_name, os_name, os_code_name, os_arch):
     """
     Find a package by name for the given platform.
@@ -272,19 +783,41 @@ def find_package(config, pkg_name, os_name, os_code_name, os_arch):
     if os_name not in config['package_sources']:
         return
 
-    for os_sources in config['package_sources'][os_name]:
-        if isinstance(os_sources, dict):
-            sources = os_sources.get(os_code_name, [])
-        else:
-            sources = [os_sources]
-        if not sources:
-            print(
-                'WARNING: No sources for %s' % (fmt_os(os_name, os_code_name)),
-                 file=sys.stderr)
-        for source in sources:
-            for p in source.enumerate_packages(os_name, os_code_name, os_arch):
-                if p == pkg_name:
-                    return p
+    for source in get_sources(config, os_name, os_code_name):
+        pkg = source.enumerate_packages(
+            os_name, os_code_name, os_arch).lookup(pkg_name)
+        if pkg is not None:
+            return pkg
+
+
+def find_packages(config, pkg_names, os_name, os_code_name, os_arch):
+    """
+    Find several packages by name for the given platform.
+
+    Each repository is searched for all of the names which have not been found
+    in a preceding repository using a single pass over its packages.
+
+    :param config: the parsed YAML configuration.
+    :param pkg_names: the names of the packages to be found.
+    :param os_name: the name of the OS associated with the packages.
+    :param os_code_name: the OS version associated with the packages.
+    :param os_arch: the system architecture associated with the packages.
+
+    :returns: a mapping of the names which were found to the parsed package
+      entries.
+    """
+    found = {}
+    if os_name not in config['package_sources']:
+        return found
+
+    remaining = set(pkg_names)
+    for source in get_sources(config, os_name, os_code_name):
+        if not remaining:
+            break
+        found.update(source.enumerate_packages(
+            os_name, os_code_name, os_arch).lookup_many(remaining))
+        remaining.difference_update(found)
+    return found
 
 
 def get_package_link(config, pkg, os_name, os_code_name, os_arch):
@@ -25,26 +25,90 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+from concurrent.futures import ProcessPoolExecutor
 import os
 import sys
 import yaml
 
 from . import summarize_broken_packages
 from .config import load_config
+from .verify import plan_queries
 from .verify import verify_rules
 
 
-def main():
+RULE_PATHS = ('rosdep/base.yaml', 'rosdep/python.yaml')
+
+
+def get_jobs():
+    """
+    Get the number of worker processes to verify the rosdep rules with.
+
+    The number is configured using the ROSDEP_REPO_CHECK_JOBS environment
+    variable, and defaults to 1, which verifies every platform in this
+    process.
+
+    :returns: the number of worker processes.
+    """
+    return int(os.environ.get('ROSDEP_REPO_CHECK_JOBS', 1))
+
+
+def load_rules():
+    repo_root = os.path.join(os.path.dirname(__file__), '..', '..')
+    rules = {}
+    for path in RULE_PATHS:
+        with open(os.path.join(repo_root, path)) as f:
+            rules[path] = yaml.safe_load(f)
+    return rules
+
+
+_worker_rules = None
+
+
+def _init_worker(rules):
+    global _worker_rules
+    _worker_rules = rules
+
+
+def verify_platform(platform):
+    """
+    Verify all rosdep rules for a single platform in a worker process.
+
+    The configuration and the repository indexes are loaded separately for
+    each platform, so they are not shared with any other platform.
+
+    :param platform: a tuple of OS name, OS version and architecture.
+
+    :returns: a set of tuples with information about the broken packages.
+    """
     config = load_config()
     broken = set()
+    for data in _worker_rules.values():
+        broken.update(verify_rules(config, data, data, platforms={platform}))
+    return broken
 
-    repo_root = os.path.join(os.path.dirname(__file__), '..', '..')
 
-    for path in ('rosdep/base.yaml', 'rosdep/python.yaml'):
-        print("Verify all rosdep keys in '%s'" % path)
-        with open(os.path.join(repo_root, path)) as f:
-            data = yaml.safe_load(f)
-        broken.update(verify_rules(config, data, data))
+def main():
+    config = load_config()
+    broken = set()
+    rules = load_rules()
+    jobs = get_jobs()
+
+    if jobs > 1:
+        platforms = set()
+        for data in rules.values():
+            _, needles = plan_queries(config, data, data)
+            platforms.update(needles.keys())
+        print('Verify all rosdep keys on %d platforms using %d processes' % (
+            len(platforms), jobs))
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(rules,),
+        ) as executor:
+            for shard in executor.map(verify_platform, sorted(platforms)):
+                broken.update(shard)
+    else:
+        for path, data in rules.items():
+            print("Verify all rosdep keys in '%s'" % path)
+            broken.update(verify_rules(config, data, data))
 
     if broken:
         print(summarize_broken_packages(broken), file=sys.stderr)
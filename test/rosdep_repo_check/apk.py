@@ -25,41 +25,16 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+import hashlib
+import io
 import os
 import tarfile
 
 from . import open_compressed_url
+from . import open_validated_snapshot
 from . import PackageEntry
 from . import RepositoryCacheCollection
-
-
-def parse_apkindex(f):
-    # An example of an APKINDEX entry. Entries are divided by a blank line.
-
-    # V:2.1.1-r0
-    # A:x86_64
-    # S:6645
-    # I:28672
-    # T:RTP proxy (documentation)
-    # U:https://www.rtpproxy.org/
-    # L:BSD-2-CLause
-    # o:rtpproxy
-    # m:Natanael Copa <ncopa@alpinelinux.org>
-    # t:1602354892
-    # c:183e99f73bb1223768aa7231a836a3e98e94c03e
-    # i:docs rtpproxy=2.1.1-r0
-    # p:alias-of-rtpproxy=2.1.1-r0
-
-    while True:
-        entry = {}
-        while (l := f.readline().decode('utf-8')) not in ['', '\n']:
-            k, v = l.strip().split(':', 1)
-            entry[k] = v
-
-        if entry:
-            yield entry
-        else:
-            break
+from .deb import parse_projected_blocks
 
 
 class Dependency:
@@ -110,7 +85,9 @@ def enumerate_apk_packages(base_url, os_name, os_code_name, os_arch):
     :param os_code_name: the OS version associated with the repository.
     :param os_arch: the system architecture associated with the repository.
 
-    :returns: an enumeration of package entries.
+    :returns: an enumeration of package entries. If the index is unchanged
+      since the repository was last enumerated, the Snapshot of that
+      enumeration is yielded instead.
     """
 
     base_url = base_url.replace('$releasever', os_code_name)
@@ -120,14 +97,45 @@ def enumerate_apk_packages(base_url, os_name, os_code_name, os_arch):
     with open_compressed_url(apkindex_url) as f:
         with tarfile.open(mode='r|', fileobj=f) as tf:
             index = None
+            validator = None
             for ti in tf:
-                if ti.name == 'APKINDEX':
+                if ti.name.startswith('.SIGN.'):
+                    # The signature is stored ahead of the index, so an
+                    # unchanged index is detected without downloading it.
+                    signature = tf.extractfile(ti).read()
+                    validator = 'apk-signature ' + hashlib.sha256(
+                        signature).hexdigest()
+                    snapshot = open_validated_snapshot(validator)
+                    if snapshot is not None:
+                        yield snapshot
+                        return
+                elif ti.name == 'APKINDEX':
                     index = tf.extractfile(ti)
                     break
             if index is None:
                 raise RuntimeError('APKINDEX url did not contain an APKINDEX file')
 
-            for index_entry in parse_apkindex(index):
+            if validator is None:
+                data = index.read()
+                validator = 'apkindex ' + hashlib.sha256(data).hexdigest()
+                snapshot = open_validated_snapshot(validator)
+                if snapshot is not None:
+                    yield snapshot
+                    return
+                index = io.BytesIO(data)
+
+            # An example of an APKINDEX entry. Entries are divided by a blank
+            # line, so the index is parsed like a debian Packages file.
+
+            # P:rtpproxy-doc
+            # V:2.1.1-r0
+            # A:x86_64
+            # T:RTP proxy (documentation)
+            # o:rtpproxy
+            # i:docs rtpproxy=2.1.1-r0
+            # p:alias-of-rtpproxy=2.1.1-r0
+
+            for index_entry in parse_projected_blocks(index, ('P', 'V', 'o', 'p')):
                 pkg_name, pkg_version, source_name = index_entry['P'], index_entry['V'], index_entry['o']
                 pkg_filename = '%s-%s.apk' % (pkg_name, pkg_version)
                 pkg_url = os.path.join(base_url, pkg_filename)
@@ -149,4 +157,5 @@ def apk_base_url(base_url):
     """
     return RepositoryCacheCollection(
         lambda os_name, os_code_name, os_arch:
-            enumerate_apk_packages(base_url, os_name, os_code_name, os_arch))
+            enumerate_apk_packages(base_url, os_name, os_code_name, os_arch),
+        key='apk ' + base_url)
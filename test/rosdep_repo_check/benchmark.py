@@ -0,0 +1,539 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Benchmarks for the repository metadata handling in rosdep_repo_check.
+
+The benchmarks operate on synthetic data and do not require network access.
+For example:
+
+    PYTHONPATH=test python3 -m rosdep_repo_check.benchmark memory
+"""
+
+import argparse
+import gzip
+import io
+import lzma
+import os
+import random
+import sys
+import tarfile
+import time
+import tracemalloc
+from xml.etree import ElementTree
+
+from . import decompress_response
+from . import PackageEntry
+from . import PackageTable
+from .deb import parse_blocks
+from .deb import parse_projected_blocks
+from .pacman import enumerate_blocks as enumerate_pacman_blocks
+from .rpm import parse_primary_xml
+from .search import TrigramIndex
+
+
+def generate_package_entries(count):
+    """
+    Generate synthetic package entries resembling a debian repository.
+
+    :param count: the number of package entries to generate.
+
+    :returns: an enumeration of package entries.
+    """
+    base_url = 'http://archive.ubuntu.com/ubuntu/'
+    for i in range(count):
+        source_name = 'source%d' % (i // 4)
+        pkg_name = 'lib%s-%d-dev' % (source_name, i % 4)
+        pkg_version = '1.%d.%d-0ubuntu1' % (i % 7, i % 13)
+        pkg_url = base_url + 'pool/main/%s/%s/%s_%s_amd64.deb' % (
+            source_name[0], source_name, pkg_name, pkg_version)
+        yield PackageEntry(pkg_name, pkg_version, pkg_url, source_name)
+        if not i % 5:
+            yield PackageEntry(
+                pkg_name + '-virtual', None, pkg_url, source_name, pkg_name)
+
+
+def _measure(build, count):
+    tracemalloc.start()
+    try:
+        container = build(generate_package_entries(count))
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return size, len(container)
+
+
+def _build_dict(entries):
+    cache = {}
+    for pkg in entries:
+        cache.setdefault(pkg, pkg)
+    return cache
+
+
+def _build_table(entries):
+    table = PackageTable()
+    for pkg in entries:
+        table.add(pkg)
+    return table
+
+
+def benchmark_memory(count):
+    """
+    Compare the memory used to store package entries.
+
+    :param count: the number of synthetic packages to store.
+    """
+    for label, build in (
+        ('dict of PackageEntry', _build_dict),
+        ('PackageTable', _build_table),
+    ):
+        size, entries = _measure(build, count)
+        print('%-24s %8d entries %10.1f MiB %8.1f bytes/entry' % (
+            label, entries, size / 1024 / 1024, size / entries))
+
+
+def generate_deb_packages_file(count):
+    """
+    Generate a synthetic debian Packages file.
+
+    :param count: the number of stanzas to generate.
+
+    :returns: the gzip-compressed content of the file.
+    """
+    stanzas = []
+    for i, pkg in enumerate(generate_package_entries(count)):
+        if pkg.binary_name != pkg.name:
+            continue
+        stanzas.append(
+            'Package: {name}\n'
+            'Architecture: amd64\n'
+            'Version: {version}\n'
+            'Priority: optional\n'
+            'Section: libdevel\n'
+            'Source: {source_name}\n'
+            'Origin: Ubuntu\n'
+            'Maintainer: Ubuntu Developers <ubuntu-devel@lists.ubuntu.com>\n'
+            'Installed-Size: {size}\n'
+            'Provides: {name}-virtual (= {version})\n'
+            'Depends: libc6 (>= 2.34), libstdc++6 (>= 12), {source_name}-data\n'
+            'Filename: {url}\n'
+            'Size: {size}0\n'
+            'MD5sum: {digest:032x}\n'
+            'SHA1: {digest:040x}\n'
+            'SHA256: {digest:064x}\n'
+            'Homepage: https://example.com/{source_name}\n'
+            'Description: development files for {name}\n'
+            'Description-md5: {digest:032x}\n'
+            ' This package contains the development files for {name}.\n'
+            ' .\n'
+            ' It is generated for benchmarking purposes.\n'.format(
+                name=pkg.name, version=pkg.version,
+                source_name=pkg.source_name, size=i,
+                url=pkg.url.split('/ubuntu/', 1)[1], digest=i * 7919))
+    return gzip.compress('\n'.join(stanzas).encode('utf-8'), 1)
+
+
+def benchmark_deb_parser(count):
+    """
+    Compare the time taken to parse a debian Packages file.
+
+    :param count: the number of synthetic packages to parse.
+    """
+    fields = ('Package', 'Version', 'Filename', 'Source', 'Provides')
+    data = generate_deb_packages_file(count)
+    for label, parse in (
+        ('parse_blocks', parse_blocks),
+        ('parse_projected_blocks',
+         lambda f: parse_projected_blocks(f, fields)),
+    ):
+        start = time.perf_counter()
+        with gzip.GzipFile(fileobj=io.BytesIO(data), mode='rb') as f:
+            blocks = sum(1 for _ in parse(f))
+        elapsed = time.perf_counter() - start
+        print('%-24s %8d blocks %8.3f s' % (label, blocks, elapsed))
+
+
+def _parse_primary_xml_etree(f, base_url):
+    # The ElementTree-based parser which parse_primary_xml replaced
+    tree = ElementTree.iterparse(f)
+    for event, element in tree:
+        if (
+            element.tag != '{http://linux.duke.edu/metadata/common}package' or
+            element.attrib.get('type', '') != 'rpm'
+        ):
+            continue
+        pkg_name = None
+        pkg_version = None
+        pkg_src_name = None
+        pkg_url = None
+        pkg_provs = []
+        for pkg_child in element:
+            if pkg_child.tag == '{http://linux.duke.edu/metadata/common}name':
+                pkg_name = pkg_child.text
+            elif pkg_child.tag == '{http://linux.duke.edu/metadata/common}version':
+                pkg_version = pkg_child.attrib.get('ver')
+                if pkg_version:
+                    pkg_epoch = pkg_child.attrib.get('epoch', '0')
+                    if pkg_epoch != '0':
+                        pkg_version = pkg_epoch + ':' + pkg_version
+                    pkg_rel = pkg_child.attrib.get('rel')
+                    if pkg_rel:
+                        pkg_version = pkg_version + '-' + pkg_rel
+            elif pkg_child.tag == '{http://linux.duke.edu/metadata/common}location':
+                pkg_href = pkg_child.attrib.get('href')
+                if pkg_href:
+                    pkg_url = os.path.join(base_url, pkg_href)
+            elif pkg_child.tag == '{http://linux.duke.edu/metadata/common}format':
+                for format_child in pkg_child:
+                    if format_child.tag == '{http://linux.duke.edu/metadata/rpm}sourcerpm':
+                        if format_child.text:
+                            pkg_src_name = '-'.join(format_child.text.split('-')[:-2])
+                    if format_child.tag != '{http://linux.duke.edu/metadata/rpm}provides':
+                        continue
+                    for provides in format_child:
+                        if (
+                            provides.tag != '{http://linux.duke.edu/metadata/rpm}entry' or
+                            'name' not in provides.attrib
+                        ):
+                            continue
+                        prov_version = None
+                        if provides.attrib.get('flags', '') == 'EQ':
+                            prov_version = provides.attrib.get('ver')
+                            if prov_version:
+                                prov_epoch = provides.attrib.get('epoch', '0')
+                                if prov_epoch != '0':
+                                    prov_version = prov_epoch + ':' + prov_version
+                                prov_rel = provides.attrib.get('rel')
+                                if prov_rel:
+                                    prov_version = prov_version + '-' + prov_rel
+                        pkg_provs.append((provides.attrib['name'], prov_version))
+        yield PackageEntry(pkg_name, pkg_version, pkg_url, pkg_src_name)
+        for prov_name, prov_version in pkg_provs:
+            yield PackageEntry(prov_name, prov_version, pkg_url, pkg_src_name, pkg_name)
+        element.clear()
+
+
+def generate_primary_xml(count):
+    """
+    Generate synthetic RPM 'primary' metadata.
+
+    :param count: the number of packages to generate.
+
+    :returns: the gzip-compressed content of the file.
+    """
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<metadata xmlns="http://linux.duke.edu/metadata/common" '
+        'xmlns:rpm="http://linux.duke.edu/metadata/rpm" '
+        'packages="%d">\n' % count]
+    for i in range(count):
+        name = 'lib%d-devel' % i
+        version = '1.%d.%d' % (i % 7, i % 13)
+        parts.append(
+            '<package type="rpm">\n'
+            '  <name>{name}</name>\n'
+            '  <arch>x86_64</arch>\n'
+            '  <version epoch="0" ver="{version}" rel="1.fc40"/>\n'
+            '  <checksum type="sha256" pkgid="YES">{digest:064x}</checksum>\n'
+            '  <summary>Development files for {name}</summary>\n'
+            '  <description>This package contains the development files '
+            'for {name}.</description>\n'
+            '  <packager>Fedora Project</packager>\n'
+            '  <url>https://example.com/{name}</url>\n'
+            '  <time file="1700000000" build="1700000000"/>\n'
+            '  <size package="{i}0" installed="{i}00" archive="{i}00"/>\n'
+            '  <location href="Packages/l/{name}-{version}-1.fc40.x86_64.rpm"/>\n'
+            '  <format>\n'
+            '    <rpm:license>MIT</rpm:license>\n'
+            '    <rpm:group>Unspecified</rpm:group>\n'
+            '    <rpm:sourcerpm>src{src}-{version}-1.fc40.src.rpm</rpm:sourcerpm>\n'
+            '    <rpm:provides>\n'
+            '      <rpm:entry name="{name}" flags="EQ" epoch="0" ver="{version}" rel="1.fc40"/>\n'
+            '      <rpm:entry name="{name}(x86-64)" flags="EQ" epoch="0" ver="{version}" rel="1.fc40"/>\n'
+            '      <rpm:entry name="pkgconfig(lib{i})" flags="EQ" epoch="0" ver="{version}"/>\n'
+            '    </rpm:provides>\n'
+            '    <rpm:requires>\n'
+            '      <rpm:entry name="lib{i}.so.1()(64bit)"/>\n'
+            '      <rpm:entry name="pkgconfig"/>\n'
+            '    </rpm:requires>\n'
+            '    <file>/usr/include/lib{i}.h</file>\n'
+            '  </format>\n'
+            '</package>\n'.format(
+                name=name, version=version, digest=i * 7919, i=i,
+                src=i // 4))
+    parts.append('</metadata>\n')
+    return gzip.compress(''.join(parts).encode('utf-8'), 1)
+
+
+def benchmark_rpm_parser(count):
+    """
+    Compare the time and memory taken to parse RPM 'primary' metadata.
+
+    :param count: the number of synthetic packages to parse.
+    """
+    base_url = 'http://example.com/fedora/40/x86_64/'
+    data = generate_primary_xml(count)
+    for label, parse in (
+        ('ElementTree.iterparse', _parse_primary_xml_etree),
+        ('parse_primary_xml', parse_primary_xml),
+    ):
+        start = time.perf_counter()
+        with gzip.GzipFile(fileobj=io.BytesIO(data), mode='rb') as f:
+            entries = sum(1 for _ in parse(f, base_url))
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        try:
+            with gzip.GzipFile(fileobj=io.BytesIO(data), mode='rb') as f:
+                for _ in parse(f, base_url):
+                    pass
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        print('%-24s %8d entries %8.3f s %8.1f MiB peak' % (
+            label, entries, elapsed, peak / 1024 / 1024))
+
+
+def _enumerate_pacman_blocks_tarfile(f):
+    # The tarfile-based parser which enumerate_pacman_blocks replaced
+    with tarfile.open(mode='r|', fileobj=f) as tf:
+        for ti in tf:
+            if not ti.name.endswith('/desc'):
+                continue
+            desc = tf.extractfile(ti)
+            block = {}
+            while True:
+                k = desc.readline()
+                if not k:
+                    break
+                k = k.strip().decode()
+                if not k:
+                    continue
+
+                v = []
+                while True:
+                    line = desc.readline().strip().decode()
+                    if not line:
+                        break
+                    v.append(line)
+
+                block[k] = v
+
+            if block:
+                yield block
+
+
+def generate_pacman_db(count):
+    """
+    Generate a synthetic pacman db.
+
+    :param count: the number of packages to generate.
+
+    :returns: the gzip-compressed content of the db.
+    """
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w', format=tarfile.GNU_FORMAT) as tf:
+        for pkg in generate_package_entries(count):
+            if pkg.binary_name != pkg.name:
+                continue
+            pkg_dir = '%s-%s' % (pkg.name, pkg.version)
+            ti = tarfile.TarInfo(pkg_dir)
+            ti.type = tarfile.DIRTYPE
+            tf.addfile(ti)
+            desc = (
+                '%FILENAME%\n{dir}-x86_64.pkg.tar.zst\n\n'
+                '%NAME%\n{name}\n\n'
+                '%BASE%\n{source_name}\n\n'
+                '%VERSION%\n{version}\n\n'
+                '%DESC%\nDevelopment files for {name}\n\n'
+                '%CSIZE%\n123456\n\n'
+                '%ISIZE%\n654321\n\n'
+                '%SHA256SUM%\n{digest:064x}\n\n'
+                '%URL%\nhttps://example.com/{source_name}\n\n'
+                '%LICENSE%\nMIT\n\n'
+                '%ARCH%\nx86_64\n\n'
+                '%BUILDDATE%\n1700000000\n\n'
+                '%PACKAGER%\nSomeone <someone@example.com>\n\n'
+                '%PROVIDES%\n{name}-virtual\nlib{name}.so=1-64\n\n'
+                '%DEPENDS%\nglibc\ngcc-libs\n{source_name}-data\n\n'.format(
+                    dir=pkg_dir, name=pkg.name, version=pkg.version,
+                    source_name=pkg.source_name, digest=len(pkg_dir) * 7919)
+            ).encode('utf-8')
+            ti = tarfile.TarInfo(pkg_dir + '/desc')
+            ti.size = len(desc)
+            tf.addfile(ti, io.BytesIO(desc))
+    return gzip.compress(buf.getvalue(), 1)
+
+
+def benchmark_pacman_parser(count):
+    """
+    Compare the time taken to parse a pacman db.
+
+    :param count: the number of synthetic packages to parse.
+    """
+    data = generate_pacman_db(count)
+    for label, parse in (
+        ('tarfile.extractfile', _enumerate_pacman_blocks_tarfile),
+        ('enumerate_blocks', enumerate_pacman_blocks),
+    ):
+        start = time.perf_counter()
+        with gzip.GzipFile(fileobj=io.BytesIO(data), mode='rb') as f:
+            blocks = sum(1 for _ in parse(f))
+        elapsed = time.perf_counter() - start
+        print('%-24s %8d blocks %8.3f s' % (label, blocks, elapsed))
+
+
+class _ThrottledResponse(io.BytesIO):
+    """In-memory response which is read at a limited bandwidth."""
+
+    def __init__(self, data, bandwidth):
+        super().__init__(data)
+        self.url = 'http://example.com/Packages.xz'
+        self._bandwidth = bandwidth
+
+    def getheader(self, name, default=None):
+        return default
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        time.sleep(len(chunk) / self._bandwidth)
+        return chunk
+
+    def readinto(self, b):
+        n = super().readinto(b)
+        time.sleep(n / self._bandwidth)
+        return n
+
+
+def benchmark_pipeline(count, bandwidth):
+    """
+    Compare the time taken to download, decompress and parse an xz file.
+
+    :param count: the number of synthetic packages to parse.
+    :param bandwidth: the simulated download bandwidth in MiB/s.
+    """
+    fields = ('Package', 'Version', 'Filename', 'Source', 'Provides')
+    data = lzma.compress(gzip.decompress(generate_deb_packages_file(count)))
+    for label, pipelined in (
+        ('serial', False),
+        ('pipelined', True),
+    ):
+        start = time.perf_counter()
+        response = _ThrottledResponse(data, bandwidth * 1024 * 1024)
+        with decompress_response(response, 'xz', pipelined) as f:
+            blocks = sum(1 for _ in parse_projected_blocks(f, fields))
+        elapsed = time.perf_counter() - start
+        print('%-24s %8d blocks %8.3f s' % (label, blocks, elapsed))
+
+
+def benchmark_fuzzy_search(count, queries):
+    """
+    Measure the time taken to index package names and to search them.
+
+    Each query is a package name with a single character replaced.
+
+    :param count: the number of synthetic packages to index.
+    :param queries: the number of queries to time.
+    """
+    names = sorted({pkg.name for pkg in generate_package_entries(count)})
+    start = time.perf_counter()
+    index = TrigramIndex(names)
+    elapsed = time.perf_counter() - start
+    print('%-24s %8d names %8.3f s' % ('index', len(names), elapsed))
+
+    rng = random.Random(0)
+    timings = []
+    for _ in range(queries):
+        name = rng.choice(names)
+        pos = rng.randrange(len(name))
+        query = name[:pos] + rng.choice('abcdefghijklmnopqrstuvwxyz') + \
+            name[pos + 1:]
+        start = time.perf_counter()
+        index.search(query)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    for label, timing in (
+        ('mean', sum(timings) / len(timings)),
+        ('p50', timings[len(timings) // 2]),
+        ('p99', timings[len(timings) * 99 // 100]),
+    ):
+        print('%-24s %8d queries %8.3f ms' % (
+            label, len(timings), timing * 1000))
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m rosdep_repo_check.benchmark',
+        description='Benchmark repository metadata handling')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    memory_parser = subparsers.add_parser(
+        'memory', help='memory used to store enumerated package entries')
+    memory_parser.add_argument('--count', type=int, default=100000)
+
+    deb_parser = subparsers.add_parser(
+        'deb-parser', help='time taken to parse a debian Packages file')
+    deb_parser.add_argument('--count', type=int, default=65000)
+
+    rpm_parser = subparsers.add_parser(
+        'rpm-parser', help='time and memory taken to parse RPM primary.xml')
+    rpm_parser.add_argument('--count', type=int, default=100000)
+
+    pacman_parser = subparsers.add_parser(
+        'pacman-parser', help='time taken to parse a pacman db')
+    pacman_parser.add_argument('--count', type=int, default=14000)
+
+    pipeline_parser = subparsers.add_parser(
+        'pipeline',
+        help='time taken to download, decompress and parse an xz file')
+    pipeline_parser.add_argument('--count', type=int, default=65000)
+    pipeline_parser.add_argument(
+        '--bandwidth', type=float, default=2.0,
+        help='the simulated download bandwidth in MiB/s')
+
+    fuzzy_parser = subparsers.add_parser(
+        'fuzzy-search', help='time taken to search package names')
+    fuzzy_parser.add_argument('--count', type=int, default=100000)
+    fuzzy_parser.add_argument('--queries', type=int, default=1000)
+
+    args = parser.parse_args(argv)
+    if args.benchmark == 'memory':
+        benchmark_memory(args.count)
+    elif args.benchmark == 'deb-parser':
+        benchmark_deb_parser(args.count)
+    elif args.benchmark == 'rpm-parser':
+        benchmark_rpm_parser(args.count)
+    elif args.benchmark == 'pacman-parser':
+        benchmark_pacman_parser(args.count)
+    elif args.benchmark == 'pipeline':
+        benchmark_pipeline(args.count, args.bandwidth)
+    elif args.benchmark == 'fuzzy-search':
+        benchmark_fuzzy_search(args.count, args.queries)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
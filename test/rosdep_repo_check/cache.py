@@ -0,0 +1,445 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import functools
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+DEFAULT_CACHE_SIZE = 2048
+"""The default size limit of the HTTP cache, in MiB."""
+
+# Eviction frees enough space for further content to be added before the
+# limit is reached again
+_EVICT_TO = 0.9
+
+# Temporary files which have not been written to for this long (in seconds)
+# were left behind by a process which was interrupted
+_STALE_TMP_AGE = 24 * 60 * 60
+
+_CACHED_HEADERS = (
+    'Content-Encoding',
+    'Content-Type',
+    'ETag',
+    'Last-Modified',
+)
+
+
+def get_cache_dir():
+    """
+    Get the directory used to persist data between runs.
+
+    The location can be overridden using the ROSDEP_REPO_CHECK_CACHE_DIR
+    environment variable. Setting the variable to an empty string disables
+    all persistent caching.
+
+    :returns: the path to the cache directory, or None if caching is disabled.
+    """
+    path = os.environ.get('ROSDEP_REPO_CHECK_CACHE_DIR')
+    if path is None:
+        path = os.path.join(
+            os.environ.get('XDG_CACHE_HOME') or
+            os.path.join(os.path.expanduser('~'), '.cache'),
+            'rosdep_repo_check')
+    return path or None
+
+
+def get_http_cache():
+    """
+    Get the persistent HTTP cache.
+
+    The size limit of the cache (in MiB) can be overridden using the
+    ROSDEP_REPO_CHECK_CACHE_SIZE environment variable.
+
+    :returns: an HTTPCache instance, or None if caching is disabled.
+    """
+    cache_dir = get_cache_dir()
+    if not cache_dir:
+        return None
+    max_size = int(os.environ.get(
+        'ROSDEP_REPO_CHECK_CACHE_SIZE', DEFAULT_CACHE_SIZE))
+    return _get_http_cache(
+        os.path.join(cache_dir, 'http'), max_size * 1024 * 1024)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_http_cache(path, max_size):
+    # The cache is shared so that the size of its content is only measured
+    # once
+    return HTTPCache(path, max_size)
+
+
+def write_file_atomic(path, data):
+    """
+    Write data to a file such that readers never observe a partial file.
+
+    :param path: the path of the file to write.
+    :param data: the bytes to be written.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _get_cached_headers(response):
+    headers = {}
+    for name in _CACHED_HEADERS:
+        value = response.getheader(name)
+        if value is not None:
+            headers[name] = value
+    return headers
+
+
+def _is_cacheable(response, headers):
+    cache_control = response.getheader('Cache-Control') or ''
+    return 'no-store' not in cache_control and (
+        'ETag' in headers or 'Last-Modified' in headers)
+
+
+def open_spooled(path, response, digest=None):
+    """
+    Open content which was downloaded to a temporary file.
+
+    The file is removed once it has been opened, so it is deleted as soon as
+    the returned stream is closed.
+
+    :param path: the path of the temporary file.
+    :param response: the urllib response the content was read from.
+    :param digest: the SHA256 digest of the content, if known.
+
+    :returns: a response-like stream of the content.
+    """
+    raw = io.FileIO(path, 'rb')
+    os.unlink(path)
+    return CachedResponse(
+        raw, response.url, _get_cached_headers(response), digest)
+
+
+class CachedResponse(io.BufferedReader):
+    """
+    A buffered stream with the response attributes used by this package.
+
+    This class mimics the parts of the urllib response interface which are
+    used to determine how the content should be decoded, so that content
+    served from the cache can be handled the same way as a live response.
+    """
+
+    def __init__(self, raw, url, headers, digest=None):
+        super().__init__(raw, buffer_size=io.DEFAULT_BUFFER_SIZE * 8)
+        self.url = url
+        self.digest = digest
+        self._headers = {k.lower(): v for k, v in headers.items()}
+
+    def getheader(self, name, default=None):
+        return self._headers.get(name.lower(), default)
+
+
+class _CachingReader(io.RawIOBase):
+    """
+    Raw stream which copies the data it reads into the HTTP cache.
+
+    The content is committed to the cache only if the response is read to
+    completion, so an abandoned or interrupted transfer is never cached.
+    """
+
+    def __init__(self, cache, url, response, headers, expected_digest=None):
+        self._cache = cache
+        self._url = url
+        self._response = response
+        self._headers = headers
+        self._expected_digest = expected_digest
+        self._hash = hashlib.sha256()
+        os.makedirs(cache.tmp_dir, exist_ok=True)
+        self._tmp = tempfile.NamedTemporaryFile(
+            dir=cache.tmp_dir, delete=False)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self._response.readinto(b)
+        if n:
+            if self._tmp is not None:
+                view = memoryview(b)[:n]
+                self._tmp.write(view)
+                self._hash.update(view)
+        elif self._tmp is not None:
+            self._commit()
+        return n
+
+    def _commit(self):
+        tmp, self._tmp = self._tmp, None
+        tmp.close()
+        digest = self._hash.hexdigest()
+        if self._expected_digest and digest != self._expected_digest:
+            os.unlink(tmp.name)
+            raise RuntimeError(
+                "SHA256 mismatch for '%s': expected %s but got %s" % (
+                    self._url, self._expected_digest, digest))
+        self._cache.commit(
+            self._url, tmp.name, digest, self._headers,
+            getattr(self._response, 'url', None))
+
+    def close(self):
+        if self._tmp is not None:
+            # Decompressors may stop reading at the end of the compressed
+            # stream without observing the end of the response body.
+            if getattr(self._response, 'length', None) == 0:
+                self._commit()
+            else:
+                tmp, self._tmp = self._tmp, None
+                tmp.close()
+                os.unlink(tmp.name)
+        self._response.close()
+        super().close()
+
+
+class HTTPCache:
+    """
+    A content-addressed on-disk cache of HTTP responses.
+
+    Response bodies are stored by the SHA256 digest of their raw content. Each
+    URL maps to the digest of the most recent response along with the ETag and
+    Last-Modified validators, so that the content can be revalidated using a
+    conditional request. When the total size of the stored content exceeds the
+    limit, the least recently used content is evicted.
+
+    The total size is measured when content is first added, and is then kept
+    as a running total of the content added since. The cache directory is
+    only scanned again once the total exceeds the limit, which also accounts
+    for any content added or removed by other processes.
+    """
+
+    def __init__(self, path, max_size):
+        self.tmp_dir = os.path.join(path, 'tmp')
+        self._objects_dir = os.path.join(path, 'objects')
+        self._urls_dir = os.path.join(path, 'urls')
+        self._max_size = max_size
+        self._size = None
+        self._size_lock = threading.Lock()
+
+    def _url_path(self, url):
+        return os.path.join(
+            self._urls_dir,
+            hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _object_path(self, digest):
+        return os.path.join(self._objects_dir, digest[:2], digest)
+
+    def lookup(self, url):
+        """
+        Get the cached metadata for a URL.
+
+        :param url: the URL which was requested.
+
+        :returns: the metadata, or None if the content is not in the cache.
+        """
+        try:
+            with open(self._url_path(url), 'rb') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('url') != url or not os.path.isfile(
+                self._object_path(meta['sha256'])):
+            return None
+        return meta
+
+    def open(self, meta):
+        """
+        Open cached content, marking it as recently used.
+
+        :param meta: the metadata returned by lookup().
+
+        :returns: a response-like stream of the cached content.
+        """
+        path = self._object_path(meta['sha256'])
+        raw = io.FileIO(path, 'rb')
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return CachedResponse(
+            raw, meta['final_url'], meta['headers'], meta['sha256'])
+
+    def open_digest(self, digest, url):
+        """
+        Open cached content by its digest, regardless of the URL it came from.
+
+        :param digest: the SHA256 digest of the content.
+        :param url: the URL to associate with the returned stream.
+
+        :returns: a response-like stream of the cached content, or None if no
+          content with the digest is in the cache.
+        """
+        path = self._object_path(digest)
+        try:
+            raw = io.FileIO(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return CachedResponse(raw, url, {}, digest)
+
+    def wrap(self, url, response, sha256=None):
+        """
+        Wrap a live response so that its content is added to the cache.
+
+        Responses without validators cannot be revalidated, so they are
+        returned without modification unless the expected digest of the
+        content is known.
+
+        :param url: the URL which was requested.
+        :param response: the urllib response.
+        :param sha256: the expected SHA256 digest of the content, if known.
+          The content is verified against it once it has been read.
+
+        :returns: a response-like stream of the content.
+        """
+        headers = _get_cached_headers(response)
+        if not sha256 and not _is_cacheable(response, headers):
+            return response
+        raw = _CachingReader(self, url, response, headers, sha256)
+        return CachedResponse(raw, response.url, headers)
+
+    def add(self, url, response, tmp_path, digest):
+        """
+        Add content which was downloaded to a file to the cache.
+
+        :param url: the URL which was requested.
+        :param response: the urllib response the content was read from.
+        :param tmp_path: path to a file in tmp_dir holding the content, which
+          is consumed by this function.
+        :param digest: the SHA256 digest of the content.
+
+        :returns: a response-like stream of the content.
+        """
+        headers = _get_cached_headers(response)
+        if not _is_cacheable(response, headers):
+            return open_spooled(tmp_path, response, digest)
+        # The open file remains readable even if it is evicted right away
+        raw = io.FileIO(tmp_path, 'rb')
+        self.commit(url, tmp_path, digest, headers, response.url)
+        return CachedResponse(raw, response.url, headers, digest)
+
+    def tee(self, url, f, sha256):
+        """
+        Wrap a stream so that its content is added to the cache for a URL.
+
+        This is used to cache content which was not downloaded as-is, such as
+        the decompressed content of a file.
+
+        :param url: the URL to associate with the content.
+        :param f: the file-like object to read the content from.
+        :param sha256: the expected SHA256 digest of the content.
+
+        :returns: a stream of the content.
+        """
+        raw = _CachingReader(self, url, f, {}, sha256)
+        return CachedResponse(raw, url, {})
+
+    def commit(self, url, tmp_path, digest, headers, final_url=None):
+        """
+        Add downloaded content to the cache.
+
+        :param url: the URL which was requested.
+        :param tmp_path: path to a temporary file holding the content, which
+          is consumed by this function.
+        :param digest: the SHA256 digest of the content.
+        :param headers: the response headers to be stored with the content.
+        :param final_url: the URL of the response after any redirects.
+        """
+        object_path = self._object_path(digest)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, object_path)
+        meta = {
+            'url': url,
+            'final_url': final_url or url,
+            'sha256': digest,
+            'headers': headers,
+            'fetched': time.time(),
+        }
+        write_file_atomic(
+            self._url_path(url), json.dumps(meta).encode('utf-8'))
+        self._evict(size)
+
+    def _evict(self, added_size):
+        """Remove the least recently used content if the limit is exceeded."""
+        with self._size_lock:
+            if self._size is not None:
+                self._size += added_size
+                if self._size <= self._max_size:
+                    return
+            self._remove_stale_tmp()
+            objects = []
+            total_size = 0
+            for prefix in os.scandir(self._objects_dir):
+                for entry in os.scandir(prefix.path):
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    objects.append((st.st_mtime, st.st_size, entry.path))
+                    total_size += st.st_size
+            if total_size > self._max_size:
+                for _, size, path in sorted(objects):
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                    total_size -= size
+                    if total_size <= self._max_size * _EVICT_TO:
+                        break
+            self._size = total_size
+
+    def _remove_stale_tmp(self):
+        # Content being downloaded is written to as it arrives, so any file
+        # which has not been written to for a long time was abandoned
+        stale = time.time() - _STALE_TMP_AGE
+        try:
+            entries = list(os.scandir(self.tmp_dir))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < stale:
+                    os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,63 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import io
+
+import pytest
+
+
+class _SplitStream(io.BytesIO):
+    """A stream which ends a read at a given offset, as a short read would."""
+
+    def __init__(self, data, split):
+        super().__init__(data)
+        self._split = split
+
+    def read(self, size=-1):
+        pos = self.tell()
+        if pos < self._split and (size < 0 or pos + size > self._split):
+            size = self._split - pos
+        return super().read(size)
+
+
+@pytest.fixture(params=(1, 7, 1024 * 1024))
+def chunk_size(request):
+    """The number of bytes for a streaming parser to read at a time."""
+    return request.param
+
+
+@pytest.fixture
+def split_streams():
+    """
+    Get a function which streams some data once for each offset within it.
+
+    Each stream ends a read at a different offset, so that every token of
+    the data is split across two reads by one of them.
+    """
+    return lambda data: (
+        _SplitStream(data, split) for split in range(1, len(data)))
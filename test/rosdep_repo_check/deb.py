@@ -25,51 +25,296 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+import functools
+import io
 import os
+import re
+from urllib.error import HTTPError
 
-from . import open_gz_url
+from . import open_compressed_url
+from . import open_validated_snapshot
 from . import PackageEntry
 from . import RepositoryCacheCollection
+from .cache import get_http_cache
+from .pdiff import update_packages_file
 
 
-def enumerate_blocks(url):
+_PROVIDES_PATTERN = re.compile(r'^([^\s(]+)\s*(?:\(\s*=\s*([^\s)]+)\s*\))?$')
+
+# Compressions which open_compressed_url can decode, by file extension
+_DECODABLE_EXTENSIONS = ('.xz', '.bz2', '.gz', '.zst', '')
+
+
+def parse_blocks(f):
     """
-    Enumerate blocks of mapped data from a URL to a text file.
+    Enumerate blocks of mapped data from a text file.
 
-    :param url: the URL of the text file.
+    :param f: the file-like object to read from.
 
     :returns: an enumeration of mappings.
     """
     block = {}
     key = None
-    with open_gz_url(url) as f:
-        while True:
-            line = f.readline().decode('utf-8')
-            if not len(line):
-                break
-            elif line[0] in ['\r', '\n']:
-                yield block
-                block = {}
-                key = None
-                continue
-            elif line[0] in [' ', '\t']:
-                # This is a list element
-                if not key:
-                    raise ValueError('list element at block beginning')
-                if not isinstance(block[key], list):
-                    block[key] = [block[key]] if block[key] else []
-                block[key].append(line.strip())
-                continue
-            key, val = line.split(':', 1)
-            key = key.strip()
-            val = val.strip()
+    while True:
+        line = f.readline().decode('utf-8')
+        if not len(line):
+            break
+        elif line[0] in ['\r', '\n']:
+            yield block
+            block = {}
+            key = None
+            continue
+        elif line[0] in [' ', '\t']:
+            # This is a list element
             if not key:
-                raise ValueError('empty key')
-            block[key] = val
+                raise ValueError('list element at block beginning')
+            if not isinstance(block[key], list):
+                block[key] = [block[key]] if block[key] else []
+            block[key].append(line.strip())
+            continue
+        key, val = line.split(':', 1)
+        key = key.strip()
+        val = val.strip()
+        if not key:
+            raise ValueError('empty key')
+        block[key] = val
     if block:
         yield block
 
 
+def _project_block(data, start, end, needles):
+    block = {}
+    for field, needle in needles:
+        pos = data.find(needle, start, end)
+        if pos < 0:
+            continue
+        pos += len(needle)
+        line_end = data.find(b'\n', pos, end)
+        if line_end < 0:
+            line_end = end
+        val = data[pos:line_end]
+        # Fold any continuation lines into the value
+        while line_end < end and data[line_end + 1] in b' \t':
+            pos = line_end + 1
+            line_end = data.find(b'\n', pos, end)
+            if line_end < 0:
+                line_end = end
+            val += b' ' + data[pos:line_end].strip()
+        block[field] = val.strip().decode('utf-8')
+    return block
+
+
+def parse_projected_blocks(f, fields, chunk_size=1024 * 1024):
+    """
+    Enumerate blocks of mapped data from a text file, extracting only some fields.
+
+    The stream is read in large chunks which are scanned for the blank lines
+    separating the blocks. Within each block, only the requested fields are
+    located and decoded, and all other data is skipped. Continuation lines of
+    a requested field are folded into a single line.
+
+    :param f: the file-like object to read from.
+    :param fields: the names of the fields to extract.
+    :param chunk_size: the number of bytes to read from the stream at a time.
+
+    :returns: an enumeration of mappings containing the requested fields which
+      were present in each block.
+    """
+    needles = [(field, b'\n' + field.encode('utf-8') + b':') for field in fields]
+    # Each block is processed with the newline preceding its first field so
+    # that every field in the block can be found using the same needle.
+    data = b'\n'
+    while True:
+        chunk = f.read(chunk_size)
+        if chunk:
+            data += chunk
+        else:
+            data += b'\n\n'
+        start = 0
+        while True:
+            end = data.find(b'\n\n', start)
+            if end < 0:
+                break
+            if end > start:
+                yield _project_block(data, start, end, needles)
+            start = end + 1
+        if not chunk:
+            break
+        data = data[start:]
+
+
+def parse_provides(text):
+    """
+    Parse the value of a debian Provides field.
+
+    :param text: the value of the field.
+
+    :returns: an enumeration of tuples of the provided name and version, which
+      is None for unversioned provides.
+    """
+    for item in text.split(','):
+        match = _PROVIDES_PATTERN.match(item.strip())
+        if match:
+            yield match.groups()
+
+
+def _strip_signature(data):
+    """Extract the signed content of an OpenPGP clearsigned message."""
+    if not data.startswith(b'-----BEGIN PGP SIGNED MESSAGE-----'):
+        return data
+    # The armor headers are terminated by an empty line
+    start = data.find(b'\n\n') + 2
+    end = data.find(b'\n-----BEGIN PGP SIGNATURE-----', start)
+    if end < 0:
+        end = len(data)
+    return data[start:end + 1]
+
+
+@functools.lru_cache(maxsize=None)
+def get_release_index(base_url, os_code_name):
+    """
+    Read the index files listed in the Release file of a debian suite.
+
+    The InRelease file is preferred, falling back to the Release file. The
+    signature is not verified, since the files are only used to locate the
+    package metadata and verify its integrity against the listed digests.
+
+    :param base_url: the debian repository base URL.
+    :param os_code_name: the OS version associated with the repository.
+
+    :returns: a tuple of a mapping of index file paths to their SHA256 digest
+      and size, and whether the files can be acquired by their hash, or None
+      if the suite has no Release file.
+    """
+    for name in ('InRelease', 'Release'):
+        release_url = os.path.join(base_url, 'dists', os_code_name, name)
+        try:
+            with open_compressed_url(release_url, compression='') as f:
+                data = f.read()
+        except HTTPError as e:
+            if e.code == 404:
+                continue
+            raise
+        break
+    else:
+        return None
+
+    release = next(
+        parse_blocks(io.BytesIO(_strip_signature(data) + b'\n')), {})
+    files = {}
+    for line in release.get('SHA256', ()):
+        parts = line.split()
+        if len(parts) == 3:
+            files[parts[2]] = (parts[0], int(parts[1]))
+    by_hash = release.get('Acquire-By-Hash', '').lower() == 'yes'
+    return files, by_hash
+
+
+def get_packages_location(base_url, comp, os_code_name, os_arch):
+    """
+    Locate the smallest variant of the Packages file of a debian repository.
+
+    :param base_url: the debian repository base URL.
+    :param comp: the component of the repository.
+    :param os_code_name: the OS version associated with the repository.
+    :param os_arch: the system architecture associated with the repository.
+
+    :returns: a tuple of the URL, the compression and the SHA256 digest of
+      the Packages file. If the suite has no usable Release file, the URL of
+      the gzip-compressed Packages file is returned without a digest.
+    """
+    index_dir = os.path.join(comp, 'binary-' + os_arch)
+    release_index = get_release_index(base_url, os_code_name)
+    candidates = []
+    if release_index:
+        files, by_hash = release_index
+        for ext in _DECODABLE_EXTENSIONS:
+            entry = files.get(os.path.join(index_dir, 'Packages' + ext))
+            if entry is not None:
+                candidates.append((entry[1], ext, entry[0]))
+    if not candidates:
+        return os.path.join(
+            base_url, 'dists', os_code_name, index_dir,
+            'Packages.gz'), 'gz', None
+
+    _, ext, digest = min(candidates)
+    if by_hash:
+        url = os.path.join(
+            base_url, 'dists', os_code_name, index_dir,
+            'by-hash', 'SHA256', digest)
+    else:
+        url = os.path.join(
+            base_url, 'dists', os_code_name, index_dir, 'Packages' + ext)
+    return url, ext[1:], digest
+
+
+def _open_packages_url(pkgs_url, compression, digest):
+    """
+    Open a Packages file, falling back from its by-hash URL if necessary.
+
+    A mirror which is part way through syncing may not have the by-hash file
+    yet, so the file is then read from its canonical name and verified
+    against the same digest.
+    """
+    try:
+        return pkgs_url, open_compressed_url(
+            pkgs_url, compression=compression, sha256=digest,
+            resumable=True)
+    except HTTPError as e:
+        if e.code != 404 or '/by-hash/' not in pkgs_url:
+            raise
+    index_url = pkgs_url.rsplit('/by-hash/', 1)[0]
+    pkgs_url = os.path.join(
+        index_url, 'Packages' + ('.' + compression if compression else ''))
+    return pkgs_url, open_compressed_url(
+        pkgs_url, compression=compression, sha256=digest, resumable=True)
+
+
+def open_packages_file(base_url, comp, os_code_name, os_arch):
+    """
+    Open the Packages file of a debian repository.
+
+    When the suite publishes PDiffs for the Packages file, a decompressed copy
+    is kept in the HTTP cache. An outdated copy is brought up to date by
+    applying the patches, falling back to downloading the whole file if the
+    copy can't be patched.
+
+    :param base_url: the debian repository base URL.
+    :param comp: the component of the repository.
+    :param os_code_name: the OS version associated with the repository.
+    :param os_arch: the system architecture associated with the repository.
+
+    :returns: a tuple of the URL the Packages file was read from and a
+      file-like object for streaming the decompressed file data.
+    """
+    pkgs_url, compression, digest = get_packages_location(
+        base_url, comp, os_code_name, os_arch)
+    release_index = get_release_index(base_url, os_code_name)
+    http_cache = get_http_cache()
+    if not http_cache or not release_index or not compression:
+        return _open_packages_url(pkgs_url, compression, digest)
+
+    files, _ = release_index
+    index_url = os.path.join(
+        base_url, 'dists', os_code_name, comp, 'binary-' + os_arch)
+    index_dir = os.path.join(comp, 'binary-' + os_arch)
+    plain = files.get(os.path.join(index_dir, 'Packages'))
+    diff_index = files.get(os.path.join(index_dir, 'Packages.diff', 'Index'))
+    if not plain or not diff_index:
+        return _open_packages_url(pkgs_url, compression, digest)
+
+    plain_url = os.path.join(index_url, 'Packages')
+    f = http_cache.open_digest(plain[0], plain_url)
+    if f is None:
+        f = update_packages_file(
+            http_cache, plain_url, os.path.join(index_url, 'Packages.diff'),
+            diff_index[0], plain[0])
+    if f is not None:
+        return plain_url, f
+    pkgs_url, f = _open_packages_url(pkgs_url, compression, digest)
+    return pkgs_url, http_cache.tee(plain_url, f, plain[0])
+
+
 def enumerate_deb_packages(base_url, comp, os_code_name, os_arch):
     """
     Enumerate debian packages in a repository.
@@ -79,15 +324,31 @@ def enumerate_deb_packages(base_url, comp, os_code_name, os_arch):
     :param os_code_name: the OS version associated with the repository.
     :param os_arch: the system architecture associated with the repository.
 
-    :returns: an enumeration of package entries.
+    :returns: an enumeration of package entries. If the Packages file is
+      unchanged since the repository was last enumerated, the Snapshot of
+      that enumeration is yielded instead.
     """
-    pkgs_url = os.path.join(base_url, 'dists', os_code_name,
-                            comp, 'binary-' + os_arch, 'Packages.gz')
+    _, _, digest = get_packages_location(
+        base_url, comp, os_code_name, os_arch)
+    if digest:
+        snapshot = open_validated_snapshot('packages sha256:' + digest)
+        if snapshot is not None:
+            yield snapshot
+            return
+    pkgs_url, f = open_packages_file(base_url, comp, os_code_name, os_arch)
     print('Reading debian package metadata from ' + pkgs_url)
-    for block in enumerate_blocks(pkgs_url):
-        pkg_url = os.path.join(base_url, block['Filename'])
-        yield PackageEntry(block['Package'], block['Version'], pkg_url,
-                           block.get('Source', block['Package']))
+    with f:
+        for block in parse_projected_blocks(
+                f, ('Package', 'Version', 'Filename', 'Source', 'Provides')):
+            pkg_name = block['Package']
+            pkg_url = os.path.join(base_url, block['Filename'])
+            pkg_src_name = block.get('Source', pkg_name)
+            yield PackageEntry(pkg_name, block['Version'], pkg_url,
+                               pkg_src_name)
+            for prov_name, prov_version in parse_provides(
+                    block.get('Provides', '')):
+                yield PackageEntry(prov_name, prov_version, pkg_url,
+                                   pkg_src_name, pkg_name)
 
 
 def deb_base_url(base_url, comp):
@@ -100,4 +361,5 @@ def deb_base_url(base_url, comp):
     """
     return RepositoryCacheCollection(
         lambda os_name, os_code_name, os_arch:
-            enumerate_deb_packages(base_url, comp, os_code_name, os_arch))
+            enumerate_deb_packages(base_url, comp, os_code_name, os_arch),
+        key='deb %s %s' % (base_url, comp))
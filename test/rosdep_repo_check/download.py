@@ -0,0 +1,139 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import hashlib
+import http.client
+import re
+import time
+from urllib.error import HTTPError
+
+from .session import get_session
+
+
+_CHUNK_SIZE = 1024 * 1024
+_MAX_RESUMES = 10
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-\d+/(\d+|\*)$')
+
+
+def _content_length(response):
+    value = response.getheader('Content-Length')
+    return int(value) if value and value.isdigit() else None
+
+
+def _range_validator(response):
+    # Weak entity tags can't be used to resume a transfer
+    etag = response.getheader('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.getheader('Last-Modified')
+
+
+def _open_range(url, headers, offset, validator, timeout):
+    headers = dict(headers)
+    headers['Range'] = 'bytes=%d-' % offset
+    headers['If-Range'] = validator
+    response = get_session().open(url, headers, timeout)
+    match = _CONTENT_RANGE.match(response.getheader('Content-Range') or '')
+    if response.status != 206 or not match or int(match.group(1)) != offset:
+        # The content changed or the server ignored the range
+        return response, None
+    total = match.group(2)
+    return response, int(total) if total != '*' else None
+
+
+def spool_response(
+    url, response, dst, headers, timeout=10, retry=2, retry_period=1,
+):
+    """
+    Copy a response to a file, resuming the transfer after transient errors.
+
+    When the transfer fails part way, the rest of the content is requested
+    using a Range request. If the server does not support ranges, or the
+    content changed since the transfer started, the transfer starts over.
+
+    :param url: the URL which was requested.
+    :param response: the urllib response.
+    :param dst: the writable, seekable file object to copy the content to.
+    :param headers: the headers to send with any further requests.
+    :param timeout: number of seconds to wait for the remote host to respond.
+    :param retry: number of times to re-attempt the transfer without making
+      any progress. The transfer is resumed no more than ten times overall.
+    :param retry_period: number of seconds to wait between retry attempts.
+
+    :returns: the SHA256 digest of the content.
+    """
+    validator = _range_validator(response)
+    total = _content_length(response)
+    digest = hashlib.sha256()
+    offset = 0
+    failures = 0
+    resumes = 0
+    while True:
+        try:
+            if response is None:
+                if validator:
+                    response, resumed_total = _open_range(
+                        url, headers, offset, validator, timeout)
+                else:
+                    response = get_session().open(url, headers, timeout)
+                    resumed_total = None
+                if resumed_total is not None:
+                    total = resumed_total
+                else:
+                    dst.seek(0)
+                    dst.truncate()
+                    digest = hashlib.sha256()
+                    offset = 0
+                    validator = _range_validator(response)
+                    total = _content_length(response)
+            while True:
+                chunk = response.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                dst.write(chunk)
+                digest.update(chunk)
+                offset += len(chunk)
+                failures = 0
+            if total is not None and offset != total:
+                raise http.client.IncompleteRead(b'', total - offset)
+        except (OSError, http.client.HTTPException) as e:
+            if response is not None:
+                response.close()
+                response = None
+            if isinstance(e, HTTPError) and e.code < 500:
+                raise
+            if failures >= retry or resumes >= _MAX_RESUMES:
+                raise
+            failures += 1
+            resumes += 1
+            print("Resuming download of '%s' at byte %d after error: %s" % (
+                url, offset if validator else 0, e))
+            time.sleep(retry_period)
+            continue
+        response.close()
+        return digest.hexdigest()
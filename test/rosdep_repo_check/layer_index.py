@@ -25,14 +25,105 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+import codecs
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+import hashlib
+import itertools
 import json
 import os
+import time
 import urllib.error
 
 from . import open_compressed_url
 from . import PackageEntry
 from . import RepositoryCacheCollection
 from . import SkipPlatform
+from .cache import get_cache_dir
+from .cache import write_file_atomic
+
+
+DEFAULT_MAP_MAX_AGE = 24 * 60 * 60
+"""The default time (in seconds) for which cached layer maps are used."""
+
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',]'
+
+
+def iterate_json_array(f, chunk_size=256 * 1024):
+    """
+    Enumerate the elements of a JSON array incrementally.
+
+    Only the current element and the unparsed remainder of the most recent
+    chunk are held in memory, rather than the whole array.
+
+    :param f: the file-like object to read the JSON document from.
+    :param chunk_size: the number of bytes to read from the stream at a time.
+
+    :returns: an enumeration of the decoded elements.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    pos = 0
+    eof = False
+    started = False
+
+    while True:
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != '[':
+                    raise ValueError('Expected a JSON array')
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == ']':
+                return
+            if buf[pos] == ',':
+                pos += 1
+                continue
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                # A number at the end of the buffer may continue in the
+                # next chunk
+                if eof or (end < len(buf) and buf[end] in _DELIMITERS):
+                    yield value
+                    pos = end
+                    continue
+        elif eof:
+            raise ValueError('Unexpected end of JSON array')
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buf = buf[pos:] + text_decoder.decode(chunk, final=eof)
+        pos = 0
+
+
+def get_map_max_age():
+    """
+    Get the time for which cached layer maps are used.
+
+    The time (in seconds) is configured using the
+    ROSDEP_REPO_CHECK_LAYER_INDEX_TTL environment variable.
+
+    :returns: the maximum age in seconds.
+    """
+    return float(os.environ.get(
+        'ROSDEP_REPO_CHECK_LAYER_INDEX_TTL', DEFAULT_MAP_MAX_AGE))
+
+
+def _get_map_cache_path(base_url, branch_name):
+    cache_dir = get_cache_dir()
+    if not cache_dir:
+        return None
+    digest = hashlib.sha256(
+        ('%s\n%s' % (base_url, branch_name)).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, 'layer_index', digest + '.json')
 
 
 def enumerate_recipes(base_url, branch_name):
@@ -40,33 +131,39 @@ def enumerate_recipes(base_url, branch_name):
     recipes_url += f'?filter=layerbranch__branch__name:{branch_name}'
     print('Reading OpenEmbedded recipe metadata from ' + recipes_url)
     with open_compressed_url(recipes_url) as f:
-        yield from json.load(f)
+        yield from iterate_json_array(f)
 
 
-def enumerate_layers_by_layer_branch_id(base_url, branch_name):
-    layers = dict(enumerate_layers(base_url))
+def enumerate_layer_branches(base_url, branch_name):
     layer_branches_url = os.path.join(base_url, 'layerBranches')
     layer_branches_url += f'?filter=branch__name:{branch_name}'
     print('Reading OpenEmbedded layer branches from ' + layer_branches_url)
     with open_compressed_url(layer_branches_url) as f:
-        for layer_branch in json.load(f):
+        for layer_branch in iterate_json_array(f):
             layer_branch_id = str(layer_branch.get('id', ''))
             layer_id = str(layer_branch.get('layer', ''))
             if not layer_branch_id or not layer_id:
                 continue
 
-            layer_name = layers.get(layer_id)
-            if not layer_name:
-                continue
+            yield (layer_branch_id, layer_id)
+
+
+def enumerate_layers_by_layer_branch_id(base_url, branch_name):
+    layers = dict(enumerate_layers(base_url))
+    for layer_branch_id, layer_id in enumerate_layer_branches(
+            base_url, branch_name):
+        layer_name = layers.get(layer_id)
+        if not layer_name:
+            continue
 
-            yield (layer_branch_id, layer_name)
+        yield (layer_branch_id, layer_name)
 
 
 def enumerate_layers(base_url):
     layers_url = os.path.join(base_url, 'layerItems')
     print('Reading OpenEmbedded layers from ' + layers_url)
     with open_compressed_url(layers_url) as f:
-        for layer in json.load(f):
+        for layer in iterate_json_array(f):
             layer_id = str(layer.get('id', ''))
             layer_name = layer.get('name')
             if not layer_id or not layer_name:
@@ -74,18 +171,104 @@ def enumerate_layers(base_url):
             yield (layer_id, layer_name)
 
 
+def fetch_layer_maps(base_url, branch_name, executor):
+    """
+    Start fetching the layers and layer branches of a layer index.
+
+    :param base_url: the OpenEmbedded layer index URL.
+    :param branch_name: the OpenEmbedded branch name.
+    :param executor: the executor to fetch the endpoints with.
+
+    :returns: a function which waits for the fetches to complete, stores the
+      result in the cache and returns a mapping of layer branch IDs to layer
+      names.
+    """
+    layers = executor.submit(
+        copy_context().run, lambda: dict(enumerate_layers(base_url)))
+    layer_branches = executor.submit(
+        copy_context().run, lambda: dict(
+            enumerate_layer_branches(base_url, branch_name)))
+
+    def result():
+        layer_names = layers.result()
+        layer_maps = {
+            'fetched': time.time(),
+            'layers': layer_names,
+            'layer_branches': layer_branches.result(),
+        }
+        path = _get_map_cache_path(base_url, branch_name)
+        if path:
+            try:
+                write_file_atomic(path, json.dumps(layer_maps).encode('utf-8'))
+            except OSError as e:
+                print("Failed to write layer map cache '%s': %s" % (
+                    path, str(e)))
+        return _join_layer_maps(layer_maps)
+
+    return result
+
+
+def load_layer_maps(base_url, branch_name, max_age):
+    """
+    Load the cached layers and layer branches of a layer index.
+
+    :param base_url: the OpenEmbedded layer index URL.
+    :param branch_name: the OpenEmbedded branch name.
+    :param max_age: the maximum age of the cached maps in seconds.
+
+    :returns: a mapping of layer branch IDs to layer names, or None if there
+      are no cached maps which are recent enough.
+    """
+    path = _get_map_cache_path(base_url, branch_name)
+    if not path or max_age <= 0:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            layer_maps = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - layer_maps.get('fetched', 0) > max_age:
+        return None
+    return _join_layer_maps(layer_maps)
+
+
+def _join_layer_maps(layer_maps):
+    layers = layer_maps['layers']
+    return {
+        layer_branch_id: layers[layer_id]
+        for layer_branch_id, layer_id in layer_maps['layer_branches'].items()
+        if layers.get(layer_id)
+    }
+
+
 def enumerate_layer_index_packages(base_url, branch_name):
     """
     Enumerate OpenEmbedded recipes in a layer index.
 
+    The layers and layer branches are fetched concurrently with the recipes,
+    unless they were cached recently. If a recipe belongs to a layer branch
+    which is missing from cached maps, the maps are fetched again.
+
     :param base_url: the OpenEmbedded layer index URL.
     :param branch_name: the OpenEmbedded branch name.
 
     :returns: an enumeration of package entries.
     """
-    layer_branches = dict(
-        enumerate_layers_by_layer_branch_id(base_url, branch_name))
-    for recipe in enumerate_recipes(base_url, branch_name):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        layer_branches = load_layer_maps(
+            base_url, branch_name, get_map_max_age())
+        refreshed = layer_branches is None
+        if refreshed:
+            layer_maps = fetch_layer_maps(base_url, branch_name, executor)
+        recipes = enumerate_recipes(base_url, branch_name)
+        # Start the recipes request while the layer maps are fetched
+        first_recipe = next(recipes, None)
+        if refreshed:
+            layer_branches = layer_maps()
+
+    if first_recipe is None:
+        return
+    for recipe in itertools.chain((first_recipe,), recipes):
         recipe_id = str(recipe.get('id', ''))
         layer_branch_id = str(recipe.get('layerbranch', ''))
         pn = recipe.get('pn')
@@ -93,6 +276,13 @@ def enumerate_layer_index_packages(base_url, branch_name):
             continue
 
         layer = layer_branches.get(layer_branch_id)
+        if not layer and not refreshed:
+            print('Cached OpenEmbedded layer maps are outdated')
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                layer_branches = fetch_layer_maps(
+                    base_url, branch_name, executor)()
+            refreshed = True
+            layer = layer_branches.get(layer_branch_id)
         if not layer:
             continue
 
@@ -126,4 +316,5 @@ def layer_index_url(base_url):
     return RepositoryCacheCollection(
         lambda os_name, os_code_name, os_arch:
             try_enumerate_layer_index_packages(
-                base_url, os_name, os_code_name))
+                base_url, os_name, os_code_name),
+        key='layer_index ' + base_url)
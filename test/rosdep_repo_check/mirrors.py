@@ -0,0 +1,196 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait
+from contextvars import copy_context
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from .cache import get_cache_dir
+from .cache import write_file_atomic
+from .session import RequestGroup
+
+
+DEFAULT_PROBES = 4
+"""The default number of mirrors to probe concurrently."""
+
+FAILURE_LATENCY = 10.0
+"""The latency (in seconds) recorded for a mirror which failed a probe."""
+
+_stats_lock = threading.Lock()
+
+
+class MirrorStats:
+    """
+    Latency statistics of mirrors, persisted across runs.
+
+    Latencies are tracked per host as an exponentially weighted moving
+    average, so that a mirror's history is shared by all of the repositories
+    it serves.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._latencies = {}
+        if path:
+            try:
+                with open(path, 'rb') as f:
+                    self._latencies = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    def latency(self, url):
+        """
+        Get the average latency of a mirror.
+
+        :param url: a URL served by the mirror.
+
+        :returns: the latency in seconds, or None if it is unknown.
+        """
+        return self._latencies.get(urlparse(url).netloc)
+
+    def record(self, url, latency):
+        """
+        Record a latency measurement of a mirror.
+
+        :param url: a URL served by the mirror.
+        :param latency: the measured latency in seconds.
+        """
+        host = urlparse(url).netloc
+        previous = self._latencies.get(host)
+        if previous is not None:
+            latency = (previous + latency) / 2
+        self._latencies[host] = latency
+
+    def rank(self, urls):
+        """
+        Order mirrors by their average latency.
+
+        Mirrors with no recorded latency follow all others in their original
+        order.
+
+        :param urls: URLs served by the mirrors.
+
+        :returns: a list of the URLs, fastest first.
+        """
+        return sorted(urls, key=lambda url: (
+            self.latency(url) is None, self.latency(url) or 0))
+
+    def save(self):
+        """Merge the recorded latencies into the persisted statistics."""
+        if not self._path:
+            return
+        with _stats_lock:
+            stats = MirrorStats(self._path)
+            stats._latencies.update(self._latencies)
+            try:
+                write_file_atomic(
+                    self._path, json.dumps(stats._latencies).encode('utf-8'))
+            except OSError as e:
+                print("Failed to write mirror statistics '%s': %s" % (
+                    self._path, str(e)))
+
+
+def get_mirror_stats():
+    """
+    Load the persisted mirror latency statistics.
+
+    :returns: a MirrorStats instance, which is not persisted if caching is
+      disabled.
+    """
+    cache_dir = get_cache_dir()
+    return MirrorStats(
+        os.path.join(cache_dir, 'mirrors.json') if cache_dir else None)
+
+
+def race(urls, probe, stats, executor, timeout=FAILURE_LATENCY):
+    """
+    Probe mirrors concurrently and measure their latency.
+
+    Once the first probe succeeds, the remaining probes are given as long
+    again to complete, after which they are abandoned. Abandoned probes are
+    recorded with FAILURE_LATENCY, like failed ones, so that a mirror which
+    doesn't answer is not ranked close to the fastest one in later runs.
+    Probes which haven't started yet are cancelled, and the connections of
+    the ones which are running are shut down, so that their threads and
+    request slots are freed promptly.
+
+    :param urls: URLs of the mirrors to probe.
+    :param probe: a function which is called with each URL and returns a
+      result, or raises an exception if the mirror is unusable.
+    :param stats: the MirrorStats instance to record the latencies in.
+    :param executor: the executor to run the probes on, which should be able
+      to run all of them concurrently.
+    :param timeout: the maximum number of seconds to wait for any probe.
+
+    :returns: a tuple of a list of tuples of the latency, URL and result of
+      each successful probe, fastest first, and a list of the URLs of the
+      probes which were abandoned.
+    """
+    results = []
+    if not urls:
+        return results, []
+    groups = {url: RequestGroup() for url in urls}
+    start = time.monotonic()
+    futures = {
+        executor.submit(copy_context().run, groups[url].run, probe, url): url
+        for url in urls}
+    pending = set(futures)
+    try:
+        deadline = start + timeout
+        while pending:
+            done, pending = wait(
+                pending, timeout=max(0, deadline - time.monotonic()),
+                return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                url = futures[future]
+                latency = time.monotonic() - start
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print("Error probing mirror '%s': %s" % (url, str(e)))
+                    stats.record(url, FAILURE_LATENCY)
+                    continue
+                stats.record(url, latency)
+                if not results:
+                    deadline = min(deadline, start + 2 * latency)
+                results.append((latency, url, result))
+        for future in pending:
+            stats.record(futures[future], FAILURE_LATENCY)
+    finally:
+        for future in pending:
+            if not future.cancel():
+                groups[futures[future]].abort()
+    results.sort(key=lambda result: result[0])
+    abandoned = {futures[future] for future in pending}
+    return results, [url for url in urls if url in abandoned]
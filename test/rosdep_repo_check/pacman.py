@@ -26,9 +26,10 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 import os
-import tarfile
 
-from . import open_compressed_url
+from . import decompress_response
+from . import open_url
+from . import open_validated_snapshot
 from . import PackageEntry
 from . import RepositoryCacheCollection
 
@@ -43,49 +44,129 @@ def replace_tokens(string, repo_name, os_arch):
     return string
 
 
-def enumerate_descs(url):
+_TAR_BLOCK_SIZE = 512
+_TAR_END_BLOCK = bytes(_TAR_BLOCK_SIZE)
+
+
+def _tar_member_name(header):
+    name = header[0:100].split(b'\0', 1)[0]
+    # GNU headers have a 'ustar  ' magic and keep the access and change
+    # times where POSIX headers keep the name prefix
+    if header[257:263] == b'ustar\0':
+        prefix = header[345:500].split(b'\0', 1)[0]
+        if prefix:
+            name = prefix + b'/' + name
+    return name
+
+
+def _pax_path(data):
+    pos = 0
+    while pos < len(data):
+        space = data.index(b' ', pos)
+        length = int(data[pos:space])
+        key, _, value = data[space + 1:pos + length - 1].partition(b'=')
+        if key == b'path':
+            return value
+        pos += length
+    return None
+
+
+def enumerate_tar_members(f, want, chunk_size=1024 * 1024):
     """
-    Enumerate desc files from a pacman db.
+    Enumerate regular files in an uncompressed tar stream in a single pass.
 
-    :param url: the URL of the pacman db.
+    The content of members which are not wanted is skipped without being
+    copied, and no file object is created for any member.
 
-    :returns: an enumeration of desc file contents.
+    :param f: the file-like object to read the tar stream from.
+    :param want: a function which is called with the name of each member and
+      returns whether its content should be enumerated.
+    :param chunk_size: the number of bytes to read from the stream at a time.
+
+    :returns: an enumeration of tuples of member name and content.
+    """
+    buf = bytearray()
+    pos = 0
+    eof = False
+
+    def fill(size):
+        nonlocal buf, pos, eof
+        if len(buf) - pos >= size:
+            return True
+        del buf[:pos]
+        pos = 0
+        while not eof and len(buf) < size:
+            chunk = f.read(max(chunk_size, size - len(buf)))
+            if not chunk:
+                eof = True
+            buf += chunk
+        return len(buf) >= size
+
+    long_name = None
+    while fill(_TAR_BLOCK_SIZE):
+        header = bytes(buf[pos:pos + _TAR_BLOCK_SIZE])
+        pos += _TAR_BLOCK_SIZE
+        if header == _TAR_END_BLOCK:
+            break
+        size = int(header[124:136].strip(b'\0 ') or b'0', 8)
+        typeflag = header[156:157]
+        padded_size = -(-size // _TAR_BLOCK_SIZE) * _TAR_BLOCK_SIZE
+        name = long_name or _tar_member_name(header).decode('utf-8')
+        long_name = None
+        metadata = typeflag in (b'L', b'x')
+        if metadata or (typeflag in (b'0', b'\0') and want(name)):
+            if not fill(padded_size):
+                raise RuntimeError('Unexpected end of tar stream')
+            data = bytes(buf[pos:pos + size])
+            if typeflag == b'L':
+                long_name = data.split(b'\0', 1)[0].decode('utf-8')
+            elif typeflag == b'x':
+                path = _pax_path(data)
+                if path is not None:
+                    long_name = path.decode('utf-8')
+            else:
+                yield name, data
+        elif not fill(padded_size):
+            raise RuntimeError('Unexpected end of tar stream')
+        pos += padded_size
+    else:
+        # The stream may end without the end of archive blocks, but not
+        # part way through a header
+        if len(buf) > pos:
+            raise RuntimeError('Unexpected end of tar stream')
+
+
+def parse_desc(data):
+    """
+    Parse the content of a desc file from a pacman db.
+
+    :param data: the content of the desc file.
+
+    :returns: a mapping of field names to lists of values.
     """
-    with open_compressed_url(url) as f:
-        with tarfile.open(mode='r|', fileobj=f) as tf:
-            for ti in tf:
-                if ti.name.endswith('/desc'):
-                    yield tf.extractfile(ti)
+    block = {}
+    for section in data.decode('utf-8').split('\n\n'):
+        lines = section.strip('\n').split('\n')
+        if lines[0]:
+            block[lines[0]] = lines[1:]
+    return block
 
 
-def enumerate_blocks(url):
+def enumerate_blocks(f):
     """
     Enumerate blocks of mapped data from a pacman db.
 
-    :param url: the URL of the pacman db.
+    Only the desc files are read. Other members, such as the file lists of a
+    '.files' db, are skipped.
+
+    :param f: the file-like object to read the uncompressed db from.
 
     :returns: an enumeration of mappings.
     """
-    for desc in enumerate_descs(url):
-        block = {}
-        while True:
-            k = desc.readline()
-            if not k:
-                break
-            k = k.strip().decode()
-            if not k:
-                continue
-
-            v = []
-            while True:
-                line = desc.readline().strip().decode()
-                if not line:
-                    break
-                v.append(line)
-
-            block[k] = v
-
-        if block: 
+    for _, data in enumerate_tar_members(
+            f, lambda name: name.endswith('/desc')):
+        block = parse_desc(data)
+        if block:
             yield block
 
 
@@ -97,18 +178,29 @@ def enumerate_pacman_packages(base_url, repo_name, os_arch):
     :param repo_name: the name of the repository to enumerate.
     :param os_arch: the system architecture associated with the repository.
 
-    :returns: an enumeration of package entries.
+    :returns: an enumeration of package entries. If the db is unchanged since
+      the repository was last enumerated, the Snapshot of that enumeration is
+      yielded instead.
     """
     base_url = replace_tokens(base_url, repo_name, os_arch)
     db_url = os.path.join(base_url, repo_name + '.db.tar.gz')
     print('Reading pacman package metadata from ' + db_url)
-    for block in enumerate_blocks(db_url):
-        pkg_url = os.path.join(base_url, block['%FILENAME%'][0])
-        pkg_name = block['%NAME%'][0]
-        pkg_ver = block['%VERSION%'][0]
-        yield PackageEntry(pkg_name, pkg_ver, pkg_url)
-        for pkg_prov in block.get('%PROVIDES%', ()):
-            yield PackageEntry(pkg_prov, pkg_ver, pkg_url, pkg_name, pkg_name)
+    response = open_url(db_url)
+    last_modified = response.getheader('Last-Modified')
+    if last_modified:
+        snapshot = open_validated_snapshot('last-modified ' + last_modified)
+        if snapshot is not None:
+            response.close()
+            yield snapshot
+            return
+    with decompress_response(response) as f:
+        for block in enumerate_blocks(f):
+            pkg_url = os.path.join(base_url, block['%FILENAME%'][0])
+            pkg_name = block['%NAME%'][0]
+            pkg_ver = block['%VERSION%'][0]
+            yield PackageEntry(pkg_name, pkg_ver, pkg_url)
+            for pkg_prov in block.get('%PROVIDES%', ()):
+                yield PackageEntry(pkg_prov, pkg_ver, pkg_url, pkg_name, pkg_name)
 
 
 def pacman_base_url(base_url, repo_name):
@@ -122,4 +214,5 @@ def pacman_base_url(base_url, repo_name):
     """
     return RepositoryCacheCollection(
         lambda os_name, os_code_name, os_arch:
-            enumerate_pacman_packages(base_url, repo_name, os_arch))
+            enumerate_pacman_packages(base_url, repo_name, os_arch),
+        key='pacman %s %s' % (base_url, repo_name))
@@ -0,0 +1,226 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import hashlib
+import io
+import os
+import tempfile
+from urllib.error import HTTPError
+from urllib.error import URLError
+
+from . import open_compressed_url
+
+
+def parse_diff_index(block):
+    """
+    Interpret the fields of a Packages.diff/Index file.
+
+    :param block: the mapping parsed from the file.
+
+    :returns: a tuple of the SHA256 digest of the current file, a list of
+      tuples of the digest of a previous file and the name of the patch which
+      applies to it, a mapping of patch names to the SHA256 digest of their
+      compressed download, and whether the patches are merged.
+    """
+    current = block.get('SHA256-Current', '').split()
+    if not current:
+        raise ValueError('Packages.diff/Index has no SHA256-Current field')
+    history = []
+    for line in block.get('SHA256-History', ()):
+        digest, _, name = line.split()
+        history.append((digest, name))
+    downloads = {}
+    for line in block.get('SHA256-Download', ()):
+        digest, _, name = line.split()
+        if name.endswith('.gz'):
+            downloads[name[:-3]] = digest
+    merged = block.get('X-Patch-Precedence', '').lower() == 'merged'
+    return current[0], history, downloads, merged
+
+
+def parse_ed_script(f):
+    """
+    Parse the commands of an ed script as produced by 'diff --ed'.
+
+    :param f: the file-like object to read the script from.
+
+    :returns: a list of tuples of the first and last line number affected, the
+      command and the lines of text it inserts, in ascending order.
+    """
+    commands = []
+    while True:
+        line = f.readline()
+        if not line:
+            break
+        line = line.rstrip(b'\n')
+        cmd = line[-1:]
+        if cmd not in (b'a', b'c', b'd'):
+            raise ValueError('Unsupported ed command: %r' % line)
+        first, _, last = line[:-1].partition(b',')
+        first = int(first)
+        last = int(last) if last else first
+        text = []
+        if cmd != b'd':
+            while True:
+                line = f.readline()
+                if not line:
+                    raise ValueError('Unterminated ed command')
+                if line == b'.\n':
+                    break
+                text.append(line)
+        if commands and first >= commands[-1][0]:
+            raise ValueError('ed commands are not in descending order')
+        commands.append((first, last, cmd, text))
+    commands.reverse()
+    return commands
+
+
+def apply_ed_script(src, commands, dst):
+    """
+    Apply the commands of an ed script to a file in a single pass.
+
+    :param src: the file-like object to read the original lines from.
+    :param commands: the commands returned by parse_ed_script().
+    :param dst: the file-like object to write the patched lines to.
+    """
+    line_number = 0
+    for first, last, cmd, text in commands:
+        # Appends insert text after the addressed line, while changes and
+        # deletions remove the addressed lines.
+        keep_until = first if cmd == b'a' else first - 1
+        if keep_until < line_number:
+            raise ValueError('ed commands overlap')
+        while line_number < keep_until:
+            line = src.readline()
+            if not line:
+                raise ValueError('ed command addresses a missing line')
+            dst.write(line)
+            line_number += 1
+        if cmd != b'a':
+            while line_number < last:
+                if not src.readline():
+                    raise ValueError('ed command addresses a missing line')
+                line_number += 1
+        dst.writelines(text)
+    while True:
+        chunk = src.read(io.DEFAULT_BUFFER_SIZE * 16)
+        if not chunk:
+            break
+        dst.write(chunk)
+
+
+class _HashingWriter:
+    """File wrapper which computes the SHA256 digest of the written data."""
+
+    def __init__(self, f):
+        self._f = f
+        self.hash = hashlib.sha256()
+
+    def write(self, data):
+        self.hash.update(data)
+        self._f.write(data)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+
+def update_packages_file(
+    http_cache, packages_url, diff_url, index_digest, target_digest
+):
+    """
+    Bring a cached copy of a Packages file up to date by applying PDiffs.
+
+    The copy is the content cached for the URL of the uncompressed Packages
+    file. The patches needed to update it are downloaded from the
+    Packages.diff directory and applied in turn, and the result is added to
+    the cache if it matches the expected digest.
+
+    :param http_cache: the HTTPCache instance holding the copy.
+    :param packages_url: the URL of the uncompressed Packages file.
+    :param diff_url: the URL of the Packages.diff directory.
+    :param index_digest: the SHA256 digest of the Packages.diff/Index file.
+    :param target_digest: the SHA256 digest of the current Packages file.
+
+    :returns: a stream of the updated Packages file, or None if the copy is
+      absent or could not be updated.
+    """
+    # Deferred to avoid a circular import with the deb module
+    from .deb import parse_blocks
+
+    meta = http_cache.lookup(packages_url)
+    if meta is None:
+        return None
+    try:
+        with open_compressed_url(
+                os.path.join(diff_url, 'Index'), compression='',
+                sha256=index_digest) as f:
+            block = next(parse_blocks(f), {})
+        current, history, downloads, merged = parse_diff_index(block)
+        if current != target_digest:
+            raise ValueError('Packages.diff/Index does not match the Release')
+        names = [name for digest, name in history]
+        try:
+            start = [digest for digest, name in history].index(meta['sha256'])
+        except ValueError:
+            print("Cached copy of '%s' is too old to be patched" % (
+                packages_url))
+            return None
+        patches = names[start:start + 1] if merged else names[start:]
+
+        digest = meta['sha256']
+        for name in patches:
+            print('Reading debian package metadata patch from ' +
+                  os.path.join(diff_url, name + '.gz'))
+            with open_compressed_url(
+                    os.path.join(diff_url, name + '.gz'), compression='gz',
+                    sha256=downloads.get(name)) as f:
+                commands = parse_ed_script(f)
+            src = http_cache.open_digest(digest, packages_url)
+            if src is None:
+                return None
+            os.makedirs(http_cache.tmp_dir, exist_ok=True)
+            with src, tempfile.NamedTemporaryFile(
+                    dir=http_cache.tmp_dir, delete=False) as tmp:
+                dst = _HashingWriter(tmp)
+                try:
+                    apply_ed_script(src, commands, dst)
+                except BaseException:
+                    tmp.close()
+                    os.unlink(tmp.name)
+                    raise
+            digest = dst.hash.hexdigest()
+            http_cache.commit(packages_url, tmp.name, digest, {})
+    except (HTTPError, URLError, OSError, RuntimeError, ValueError) as e:
+        print("Failed to patch cached copy of '%s': %s" % (
+            packages_url, str(e)))
+        return None
+    if digest != target_digest:
+        print("Patched copy of '%s' does not match the Release" % (
+            packages_url))
+        return None
+    return http_cache.open_digest(digest, packages_url)
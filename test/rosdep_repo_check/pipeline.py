@@ -0,0 +1,187 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import io
+import os
+import queue
+import threading
+
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+"""The size of the buffers passed between the stages of a pipeline."""
+
+DEFAULT_DEPTH = 4
+"""The number of buffers which may be queued between two stages."""
+
+
+def is_pipelining_enabled():
+    """
+    Determine if compressed downloads should be decompressed in a pipeline.
+
+    Pipelining is enabled by setting the ROSDEP_REPO_CHECK_PIPELINE
+    environment variable to '1'.
+
+    :returns: True if pipelining is enabled.
+    """
+    return os.environ.get('ROSDEP_REPO_CHECK_PIPELINE', '') == '1'
+
+
+class _Failure:
+
+    def __init__(self, exc):
+        self.exc = exc
+
+
+class _Stage:
+    """A bounded queue of buffers which can be abandoned by the consumer."""
+
+    def __init__(self, stopped, depth):
+        self._queue = queue.Queue(depth)
+        self._stopped = stopped
+
+    def put(self, item):
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            return True
+        return False
+
+    def get(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopped.is_set():
+                    return b''
+                continue
+            break
+        if isinstance(item, _Failure):
+            raise item.exc
+        return item
+
+
+class _StageReader(io.RawIOBase):
+    """Raw stream which reads the buffers produced by a pipeline stage."""
+
+    def __init__(self, stage):
+        self._stage = stage
+        self._view = memoryview(b'')
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._view:
+            if self._eof:
+                return 0
+            chunk = self._stage.get()
+            if not chunk:
+                self._eof = True
+                return 0
+            self._view = memoryview(chunk)
+        n = min(len(b), len(self._view))
+        b[:n] = self._view[:n]
+        self._view = self._view[n:]
+        return n
+
+
+class PipelinedReader(io.RawIOBase):
+    """
+    Raw stream which downloads and decompresses on separate threads.
+
+    One thread reads the response into a bounded queue of large buffers, and
+    another decompresses those buffers into a second bounded queue, from which
+    this stream is read. Waiting for the network, decompression and parsing
+    can therefore overlap, while the memory used remains bounded by the depth
+    of the queues.
+    """
+
+    def __init__(
+        self, response, decompress, buffer_size=DEFAULT_BUFFER_SIZE,
+        depth=DEFAULT_DEPTH,
+    ):
+        self._response = response
+        self._stopped = threading.Event()
+        self._downloaded = _Stage(self._stopped, depth)
+        self._decompressed = _Stage(self._stopped, depth)
+        self._reader = _StageReader(self._decompressed)
+        self._threads = [
+            threading.Thread(
+                target=self._run, args=(
+                    response, self._downloaded, buffer_size),
+                daemon=True),
+            threading.Thread(
+                target=self._run, args=(
+                    decompress(_StageReader(self._downloaded)),
+                    self._decompressed, buffer_size),
+                daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self, f, stage, buffer_size):
+        try:
+            while True:
+                chunk = f.read(buffer_size)
+                if not stage.put(chunk) or not chunk:
+                    break
+        except BaseException as e:
+            stage.put(_Failure(e))
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._reader.readinto(b)
+
+    def close(self):
+        if not self.closed:
+            self._stopped.set()
+            for thread in self._threads:
+                thread.join()
+            self._response.close()
+        super().close()
+
+
+def open_pipelined(response, decompress, buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    Decompress a response on background threads.
+
+    :param response: the response returned by open_url().
+    :param decompress: a function which wraps a file-like object of the
+      compressed content in a decompressing stream.
+    :param buffer_size: the size of the buffers passed between the threads.
+
+    :returns: file-like object for streaming the decompressed data.
+    """
+    return io.BufferedReader(
+        PipelinedReader(response, decompress, buffer_size),
+        buffer_size=buffer_size)
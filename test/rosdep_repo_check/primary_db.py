@@ -0,0 +1,228 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+from . import open_compressed_url
+from . import PackageEntry
+from .cache import get_cache_dir
+
+
+_PACKAGE_COLUMNS = 'name, epoch, version, release, location_href, rpm_sourcerpm'
+
+
+def _format_version(epoch, version, release):
+    if not version:
+        return None
+    if epoch and epoch != '0':
+        version = epoch + ':' + version
+    if release:
+        version = version + '-' + release
+    return version
+
+
+def _source_name(sourcerpm):
+    if not sourcerpm:
+        return None
+    return '-'.join(sourcerpm.split('-')[:-2])
+
+
+class PrimaryDatabase:
+    """
+    A read-only package index backed by an RPM 'primary_db' SQLite database.
+
+    Packages and the capabilities they provide are looked up using the
+    indexes on the name columns of the database, so the metadata never needs
+    to be parsed in full. Lookups return the same entries as enumerating the
+    'primary' XML metadata of the repository would.
+    """
+
+    def __init__(self, path, base_url):
+        self._base_url = base_url
+        self._conn = sqlite3.connect(
+            'file:%s?mode=ro' % path, uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        # Fail early if this isn't a usable database
+        self._conn.execute('SELECT pkgKey FROM packages LIMIT 1').fetchall()
+        self._conn.execute('SELECT pkgKey FROM provides LIMIT 1').fetchall()
+
+    def _package_entry(self, row):
+        name, epoch, version, release, href, sourcerpm = row
+        return PackageEntry(
+            name, _format_version(epoch, version, release),
+            os.path.join(self._base_url, href) if href else None,
+            _source_name(sourcerpm))
+
+    def _provides_entry(self, prov_row, pkg_entry):
+        prov_name, flags, epoch, version, release = prov_row
+        prov_version = None
+        if flags == 'EQ':
+            prov_version = _format_version(epoch, version, release)
+        return PackageEntry(
+            prov_name, prov_version, pkg_entry.url, pkg_entry.source_name,
+            pkg_entry.name)
+
+    def __iter__(self):
+        with self._lock:
+            packages = self._conn.execute(
+                'SELECT pkgKey, ' + _PACKAGE_COLUMNS +
+                ' FROM packages ORDER BY pkgKey').fetchall()
+            provides = self._conn.execute(
+                'SELECT pkgKey, name, flags, epoch, version, release'
+                ' FROM provides ORDER BY pkgKey, rowid').fetchall()
+        provides_index = 0
+        for row in packages:
+            pkg_key = row[0]
+            pkg = self._package_entry(row[1:])
+            yield pkg
+            while (
+                provides_index < len(provides) and
+                provides[provides_index][0] <= pkg_key
+            ):
+                prov_row = provides[provides_index]
+                provides_index += 1
+                if prov_row[0] == pkg_key:
+                    yield self._provides_entry(prov_row[1:], pkg)
+
+    def lookup(self, name):
+        """
+        Look up a package by name.
+
+        :param name: the name of the package to look up.
+
+        :returns: the first package entry with the given name, or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT ' + _PACKAGE_COLUMNS + ' FROM packages'
+                ' WHERE name = ? ORDER BY pkgKey LIMIT 1', (name,)).fetchone()
+            if row is not None:
+                return self._package_entry(row)
+            row = self._conn.execute(
+                'SELECT pr.name, pr.flags, pr.epoch, pr.version, pr.release, '
+                'p.name, p.epoch, p.version, p.release, p.location_href, '
+                'p.rpm_sourcerpm FROM provides AS pr'
+                ' JOIN packages AS p ON p.pkgKey = pr.pkgKey'
+                ' WHERE pr.name = ? ORDER BY pr.pkgKey, pr.rowid LIMIT 1',
+                (name,)).fetchone()
+        if row is None:
+            return None
+        return self._provides_entry(row[:5], self._package_entry(row[5:]))
+
+
+def get_primary_db_path(repomd_url):
+    """
+    Get the path where the primary database of a repository is kept.
+
+    :param repomd_url: the URL of the 'repo' metadata of the repository.
+
+    :returns: the path to the database, or None if caching is disabled.
+    """
+    cache_dir = get_cache_dir()
+    if not cache_dir:
+        return None
+    digest = hashlib.sha256(repomd_url.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, 'primary_db', digest + '.sqlite')
+
+
+def _checksum_path(path):
+    return path + '.checksum'
+
+
+def open_primary_db(repomd_url, db_url, open_checksum, base_url):
+    """
+    Download a primary database if necessary, and open it.
+
+    The decompressed database is kept in the cache directory along with the
+    checksum of its content, so that it is only downloaded again once the
+    repository metadata lists a different checksum.
+
+    :param repomd_url: the URL of the 'repo' metadata of the repository.
+    :param db_url: the URL of the compressed database.
+    :param open_checksum: a tuple of the checksum type and value of the
+      decompressed database, or None if unknown.
+    :param base_url: the RPM repository base URL.
+
+    :returns: a PrimaryDatabase instance.
+    """
+    path = get_primary_db_path(repomd_url)
+    if path and open_checksum:
+        try:
+            with open(_checksum_path(path), 'r') as f:
+                if f.read() == ':'.join(open_checksum) and \
+                        os.path.isfile(path):
+                    return PrimaryDatabase(path, base_url)
+        except (OSError, sqlite3.DatabaseError):
+            pass
+
+    print('Reading RPM primary database from ' + db_url)
+    tmp_dir = os.path.dirname(path) if path else None
+    if tmp_dir:
+        os.makedirs(tmp_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as dst, open_compressed_url(
+            db_url, resumable=True,
+        ) as src:
+            if open_checksum:
+                checksum = hashlib.new(open_checksum[0])
+                while True:
+                    chunk = src.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    checksum.update(chunk)
+                    dst.write(chunk)
+                if checksum.hexdigest() != open_checksum[1]:
+                    raise RuntimeError(
+                        "Checksum mismatch for '%s'" % db_url)
+            else:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        if not path:
+            # The open connection keeps the unlinked file available
+            db = PrimaryDatabase(tmp_path, base_url)
+            os.unlink(tmp_path)
+            return db
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    if open_checksum:
+        with open(_checksum_path(path), 'w') as f:
+            f.write(':'.join(open_checksum))
+    elif os.path.exists(_checksum_path(path)):
+        os.unlink(_checksum_path(path))
+    return PrimaryDatabase(path, base_url)
@@ -25,13 +25,27 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import os
 from xml.etree import ElementTree
+from xml.parsers import expat
 
 from . import open_compressed_url
+from . import open_validated_snapshot
 from . import PackageEntry
 from . import RepositoryCacheCollection
 from . import URLError
+from .mirrors import DEFAULT_PROBES
+from .mirrors import FAILURE_LATENCY
+from .mirrors import get_mirror_stats
+from .mirrors import race
+from .primary_db import open_primary_db
+from .primary_db import sqlite3
+
+
+_MAX_PROBES_PER_MIRROR = 2
 
 
 def replace_tokens(string, os_name, os_code_name, os_arch):
@@ -45,31 +59,196 @@ def replace_tokens(string, os_name, os_code_name, os_arch):
     return string
 
 
-def get_primary_name(repomd_url):
-    """Get the URL of the 'primary' metadata from the 'repo' metadata."""
+def get_repo_data(repomd_url):
+    """
+    Get the metadata files listed in the 'repo' metadata.
+
+    :param repomd_url: the URL of the 'repo' metadata.
+
+    :returns: a tuple of the revision of the repository (or None if absent),
+      and a mapping of data types to a mapping with the 'location' of the
+      file and, where present, its 'checksum' and 'open-checksum' as tuples
+      of the checksum type and value.
+    """
     print('Reading RPM repository metadata from ' + repomd_url)
+    revision = None
+    repo_data = {}
     with open_compressed_url(repomd_url) as f:
         tree = iter(ElementTree.iterparse(f, events=('start', 'end')))
         event, root = next(tree)
         if root.tag != '{http://linux.duke.edu/metadata/repo}repomd':
             raise RuntimeError('Invalid root element in repository metadata: ' + root.tag)
         for event, root_child in tree:
+            if event != 'end':
+                continue
+            if root_child.tag == '{http://linux.duke.edu/metadata/repo}revision':
+                revision = root_child.text
+                continue
             if (
                 root_child.tag != '{http://linux.duke.edu/metadata/repo}data' or
-                root_child.attrib.get('type', '') != 'primary'
+                'type' not in root_child.attrib
             ):
-                root.clear()
                 continue
+            data = {}
             for data_child in root_child:
-                if (
-                    data_child.tag != '{http://linux.duke.edu/metadata/repo}location' or
-                    'href' not in data_child.attrib
+                if data_child.tag == '{http://linux.duke.edu/metadata/repo}location':
+                    if 'href' in data_child.attrib:
+                        data['location'] = data_child.attrib['href']
+                elif data_child.tag in (
+                    '{http://linux.duke.edu/metadata/repo}checksum',
+                    '{http://linux.duke.edu/metadata/repo}open-checksum',
                 ):
-                    root.clear()
-                    continue
-                return data_child.attrib['href']
+                    data[data_child.tag.split('}', 1)[1]] = (
+                        data_child.attrib.get('type', ''), data_child.text)
+            if 'location' in data:
+                repo_data.setdefault(root_child.attrib['type'], data)
             root.clear()
-    raise RuntimeError('Failed to determine primary data file name')
+    return revision, repo_data
+
+
+def get_primary_name(repomd_url):
+    """Get the URL of the 'primary' metadata from the 'repo' metadata."""
+    _, repo_data = get_repo_data(repomd_url)
+    if 'primary' not in repo_data:
+        raise RuntimeError('Failed to determine primary data file name')
+    return repo_data['primary']['location']
+
+
+_COMMON_NS = 'http://linux.duke.edu/metadata/common '
+_RPM_NS = 'http://linux.duke.edu/metadata/rpm '
+_PACKAGE_TAG = _COMMON_NS + 'package'
+_NAME_TAG = _COMMON_NS + 'name'
+_VERSION_TAG = _COMMON_NS + 'version'
+_LOCATION_TAG = _COMMON_NS + 'location'
+_SOURCERPM_TAG = _RPM_NS + 'sourcerpm'
+_PROVIDES_TAG = _RPM_NS + 'provides'
+_ENTRY_TAG = _RPM_NS + 'entry'
+
+
+def _format_evr(attrib):
+    version = attrib.get('ver')
+    if not version:
+        return None
+    epoch = attrib.get('epoch', '0')
+    if epoch != '0':
+        version = epoch + ':' + version
+    release = attrib.get('rel')
+    if release:
+        version = version + '-' + release
+    return version
+
+
+class _PrimaryHandler:
+    """
+    Expat handlers which extract package entries from 'primary' metadata.
+
+    Only the name, version, location, source RPM and provides of each package
+    are retained, and nothing is kept once a package has been completed.
+
+    To minimize the number of handler calls, element end and character data
+    handlers are only installed while the text of an element is collected.
+    Instead, a package is completed when the next one starts or the document
+    ends, and the provides of a package end with the first element which is
+    not a provides entry.
+    """
+
+    def __init__(self, parser, base_url):
+        self._parser = parser
+        self._base_url = base_url
+        self.entries = []
+        self._in_package = False
+        self._in_provides = False
+        self._text = None
+        self._text_tag = None
+        self._name = None
+        self._version = None
+        self._url = None
+        self._sourcerpm = None
+        self._provides = []
+
+    def start_element(self, tag, attrib):
+        if tag == _ENTRY_TAG:
+            if self._in_provides and 'name' in attrib:
+                self._provides.append((
+                    attrib['name'],
+                    _format_evr(attrib)
+                    if attrib.get('flags', '') == 'EQ' else None))
+            return
+        self._in_provides = False
+        if tag == _PACKAGE_TAG:
+            self.finish_package()
+            self._in_package = attrib.get('type', '') == 'rpm'
+        elif not self._in_package:
+            return
+        elif tag == _NAME_TAG or tag == _SOURCERPM_TAG:
+            self._text = []
+            self._text_tag = tag
+            self._parser.CharacterDataHandler = self._text.append
+            self._parser.EndElementHandler = self.end_text_element
+        elif tag == _VERSION_TAG:
+            self._version = _format_evr(attrib)
+        elif tag == _LOCATION_TAG:
+            href = attrib.get('href')
+            if href:
+                self._url = os.path.join(self._base_url, href)
+        elif tag == _PROVIDES_TAG:
+            self._in_provides = True
+
+    def end_text_element(self, tag):
+        self._parser.CharacterDataHandler = None
+        self._parser.EndElementHandler = None
+        text = ''.join(self._text)
+        self._text = None
+        if self._text_tag == _NAME_TAG:
+            self._name = text
+        elif text:
+            self._sourcerpm = '-'.join(text.split('-')[:-2])
+
+    def finish_package(self):
+        """Emit the entries of the current package, if there is one."""
+        if not self._in_package:
+            return
+        self.entries.append(PackageEntry(
+            self._name, self._version, self._url, self._sourcerpm))
+        for prov_name, prov_version in self._provides:
+            self.entries.append(PackageEntry(
+                prov_name, prov_version, self._url, self._sourcerpm,
+                self._name))
+        self._in_package = False
+        self._name = None
+        self._version = None
+        self._url = None
+        self._sourcerpm = None
+        self._provides = []
+
+
+def parse_primary_xml(f, base_url, chunk_size=256 * 1024):
+    """
+    Enumerate packages in RPM 'primary' metadata.
+
+    The metadata is parsed incrementally using expat, so that memory usage
+    does not depend on the size of the file.
+
+    :param f: the file-like object to read the metadata from.
+    :param base_url: the RPM repository base URL.
+    :param chunk_size: the number of bytes to read from the stream at a time.
+
+    :returns: an enumeration of package entries.
+    """
+    parser = expat.ParserCreate(namespace_separator=' ')
+    parser.buffer_text = True
+    handler = _PrimaryHandler(parser, base_url)
+    parser.StartElementHandler = handler.start_element
+    while True:
+        chunk = f.read(chunk_size)
+        parser.Parse(chunk, not chunk)
+        if not chunk:
+            handler.finish_package()
+        if handler.entries:
+            yield from handler.entries
+            handler.entries = []
+        if not chunk:
+            break
 
 
 def enumerate_base_urls(mirrorlist_url):
@@ -85,7 +264,9 @@ def enumerate_base_urls(mirrorlist_url):
             yield line
 
 
-def enumerate_rpm_packages(base_url, os_name, os_code_name, os_arch):
+def enumerate_rpm_packages(
+    base_url, os_name, os_code_name, os_arch, repo_data=None
+):
     """
     Enumerate packages in an RPM repository.
 
@@ -93,77 +274,80 @@ def enumerate_rpm_packages(base_url, os_name, os_code_name, os_arch):
     :param os_name: the name of the OS associated with the repository.
     :param os_code_name: the OS version associated with the repository.
     :param os_arch: the system architecture associated with the repository.
+    :param repo_data: the metadata files listed in the 'repo' metadata, as
+      returned by get_repo_data(), if it has already been read.
 
-    :returns: an enumeration of package entries.
+    :returns: an enumeration of package entries. If the repository provides
+      a 'primary_db' database, a PrimaryDatabase index is yielded instead,
+      and if the 'primary' metadata is unchanged since the repository was
+      last enumerated, the Snapshot of that enumeration is yielded.
     """
     base_url = replace_tokens(base_url, os_name, os_code_name, os_arch)
     repomd_url = os.path.join(base_url, 'repodata', 'repomd.xml')
-    primary_xml_name = get_primary_name(repomd_url)
-    primary_xml_url = os.path.join(base_url, primary_xml_name)
+    if repo_data is None:
+        _, repo_data = get_repo_data(repomd_url)
+    if 'primary_db' in repo_data and sqlite3 is not None:
+        primary_db = repo_data['primary_db']
+        open_checksum = primary_db.get('open-checksum')
+        if open_checksum:
+            checksum_type = open_checksum[0]
+            if checksum_type == 'sha':
+                # Old repositories use 'sha' to refer to SHA-1
+                checksum_type = 'sha1'
+            if checksum_type in hashlib.algorithms_available:
+                open_checksum = (checksum_type, open_checksum[1])
+            else:
+                open_checksum = None
+        try:
+            db = open_primary_db(
+                repomd_url,
+                os.path.join(base_url, primary_db['location']),
+                open_checksum, base_url)
+        except sqlite3.DatabaseError as e:
+            print("Failed to open RPM primary database for '%s': %s" % (
+                base_url, str(e)))
+            print('Falling back to primary XML metadata...')
+        else:
+            yield db
+            return
+    if 'primary' not in repo_data:
+        raise RuntimeError('Failed to determine primary data file name')
+    checksum = repo_data['primary'].get('checksum')
+    if checksum:
+        snapshot = open_validated_snapshot('primary %s:%s' % checksum)
+        if snapshot is not None:
+            yield snapshot
+            return
+    primary_xml_url = os.path.join(base_url, repo_data['primary']['location'])
     print('Reading RPM primary metadata from ' + primary_xml_url)
-    with open_compressed_url(primary_xml_url) as f:
-        tree = ElementTree.iterparse(f)
-        for event, element in tree:
-            if (
-                element.tag != '{http://linux.duke.edu/metadata/common}package' or
-                element.attrib.get('type', '') != 'rpm'
-            ):
-                continue
-            pkg_name = None
-            pkg_version = None
-            pkg_src_name = None
-            pkg_url = None
-            pkg_provs = []
-            for pkg_child in element:
-                if pkg_child.tag == '{http://linux.duke.edu/metadata/common}name':
-                    pkg_name = pkg_child.text
-                elif pkg_child.tag == '{http://linux.duke.edu/metadata/common}version':
-                    pkg_version = pkg_child.attrib.get('ver')
-                    if pkg_version:
-                        pkg_epoch = pkg_child.attrib.get('epoch', '0')
-                        if pkg_epoch != '0':
-                            pkg_version = pkg_epoch + ':' + pkg_version
-                        pkg_rel = pkg_child.attrib.get('rel')
-                        if pkg_rel:
-                            pkg_version = pkg_version + '-' + pkg_rel
-                elif pkg_child.tag == '{http://linux.duke.edu/metadata/common}location':
-                    pkg_href = pkg_child.attrib.get('href')
-                    if pkg_href:
-                        pkg_url = os.path.join(base_url, pkg_href)
-                elif pkg_child.tag == '{http://linux.duke.edu/metadata/common}format':
-                    for format_child in pkg_child:
-                        if format_child.tag == '{http://linux.duke.edu/metadata/rpm}sourcerpm':
-                            if format_child.text:
-                                pkg_src_name = '-'.join(format_child.text.split('-')[:-2])
-                        if format_child.tag != '{http://linux.duke.edu/metadata/rpm}provides':
-                            continue
-                        for provides in format_child:
-                            if (
-                                provides.tag != '{http://linux.duke.edu/metadata/rpm}entry' or
-                                'name' not in provides.attrib
-                            ):
-                                continue
-                            prov_version = None
-                            if provides.attrib.get('flags', '') == 'EQ':
-                                prov_version = provides.attrib.get('ver')
-                                if prov_version:
-                                    prov_epoch = provides.attrib.get('epoch', '0')
-                                    if prov_epoch != '0':
-                                        prov_version = prov_epoch + ':' + prov_version
-                                    prov_rel = provides.attrib.get('rel')
-                                    if prov_rel:
-                                        prov_version = prov_version + '-' + prov_rel
-                            pkg_provs.append((provides.attrib['name'], prov_version))
-            yield PackageEntry(pkg_name, pkg_version, pkg_url, pkg_src_name)
-            for prov_name, prov_version in pkg_provs:
-                yield PackageEntry(prov_name, prov_version, pkg_url, pkg_src_name, pkg_name)
-            element.clear()
+    sha256 = checksum[1] if checksum and checksum[0] == 'sha256' else None
+    with open_compressed_url(
+        primary_xml_url, sha256=sha256, resumable=True,
+    ) as f:
+        yield from parse_primary_xml(f, base_url)
+
+
+def _revision_key(revision):
+    # Revisions are usually timestamps, but may be arbitrary strings
+    if revision is None:
+        return (0, 0, '')
+    if revision.isdigit():
+        return (1, int(revision), revision)
+    return (1, 0, revision)
 
 
 def enumerate_rpm_packages_from_mirrorlist(mirrorlist_url, os_name, os_code_name, os_arch):
     """
     Enumerate packages in an RPM repository using a mirrorlist.
 
+    Mirrors are probed concurrently by fetching their 'repo' metadata, and
+    packages are read from the fastest mirror with the newest revision.
+    Mirrors are probed in order of their latency in previous runs. If a
+    mirror fails, enumeration resumes from another mirror with the same
+    revision without repeating any packages. A mirror whose probe is
+    abandoned because it is too slow is probed once more after the others,
+    and is given up on if it is abandoned again.
+
     :param mirrorlist_url: the RPM repository mirrorlist file URL.
     :param os_name: the name of the OS associated with the repository.
     :param os_code_name: the OS version associated with the repository.
@@ -173,25 +357,64 @@ def enumerate_rpm_packages_from_mirrorlist(mirrorlist_url, os_name, os_code_name
     """
     mirrorlist_url = replace_tokens(mirrorlist_url, os_name, os_code_name, os_arch)
     print('Reading RPM mirrorlist from ' + mirrorlist_url)
-    for base_url in enumerate_base_urls(mirrorlist_url):
-        try:
-            for pkg in enumerate_rpm_packages(base_url, os_name, os_code_name, os_arch):
-                yield pkg
-            else:
+    stats = get_mirror_stats()
+    remaining = stats.rank([
+        replace_tokens(base_url, os_name, os_code_name, os_arch)
+        for base_url in enumerate_base_urls(mirrorlist_url)])
+    attempts = Counter()
+    revision = None
+    revision_known = False
+    candidates = []
+    yielded = 0
+    executor = ThreadPoolExecutor(max_workers=DEFAULT_PROBES)
+    try:
+        while True:
+            if not candidates:
+                if not remaining:
+                    raise RuntimeError('All mirrors were tried')
+                probes = remaining[:DEFAULT_PROBES]
+                del remaining[:DEFAULT_PROBES]
+                attempts.update(probes)
+                results, abandoned = race(
+                    probes, lambda base_url: get_repo_data(
+                        os.path.join(base_url, 'repodata', 'repomd.xml')),
+                    stats, executor)
+                # Slow mirrors may still be needed if the others fail
+                remaining.extend(
+                    base_url for base_url in abandoned
+                    if attempts[base_url] < _MAX_PROBES_PER_MIRROR)
+                if not revision_known and results:
+                    revision = max(
+                        (result[2][0] for result in results), key=_revision_key)
+                    revision_known = True
+                candidates = [
+                    (base_url, repo_data)
+                    for _, base_url, (mirror_revision, repo_data) in results
+                    if mirror_revision == revision]
+                continue
+            base_url, repo_data = candidates.pop(0)
+            try:
+                # Mirrors with the same revision list packages in the same
+                # order, so those already enumerated can be skipped.
+                for index, pkg in enumerate(enumerate_rpm_packages(
+                        base_url, os_name, os_code_name, os_arch, repo_data)):
+                    if index >= yielded:
+                        yielded += 1
+                        yield pkg
                 return
-        except Exception as e:
-            if not isinstance(e, (
-                ConnectionResetError,
-                RuntimeError,
-                URLError,
-            )):
-                raise
-            print("Error reading from mirror '%s': %s" % (base_url, str(e)))
-            print('Falling back to next available mirror...')
-            # We may end up re-enumerating some packages, but it's better than
-            # erroring out due to a connection reset...
-    else:
-        raise RuntimeError('All mirrors were tried')
+            except Exception as e:
+                if not isinstance(e, (
+                    ConnectionResetError,
+                    RuntimeError,
+                    URLError,
+                )):
+                    raise
+                print("Error reading from mirror '%s': %s" % (base_url, str(e)))
+                print('Falling back to next available mirror...')
+                stats.record(base_url, FAILURE_LATENCY)
+    finally:
+        executor.shutdown()
+        stats.save()
 
 
 def rpm_base_url(base_url):
@@ -204,7 +427,8 @@ def rpm_base_url(base_url):
     """
     return RepositoryCacheCollection(
         lambda os_name, os_code_name, os_arch:
-            enumerate_rpm_packages(base_url, os_name, os_code_name, os_arch))
+            enumerate_rpm_packages(base_url, os_name, os_code_name, os_arch),
+        key='rpm ' + base_url)
 
 
 def rpm_mirrorlist_url(mirrorlist_url):
@@ -218,4 +442,5 @@ def rpm_mirrorlist_url(mirrorlist_url):
     return RepositoryCacheCollection(
         lambda os_name, os_code_name, os_arch:
             enumerate_rpm_packages_from_mirrorlist(
-                mirrorlist_url, os_name, os_code_name, os_arch))
+                mirrorlist_url, os_name, os_code_name, os_arch),
+        key='rpm-mirrorlist ' + mirrorlist_url)
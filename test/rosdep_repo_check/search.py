@@ -0,0 +1,436 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Fuzzy search over the names of the packages in the configured repositories.
+
+For example:
+
+    PYTHONPATH=test python3 -m rosdep_repo_check.search ubuntu libyaml-cpp
+"""
+
+from array import array
+import argparse
+from collections import Counter
+import heapq
+from itertools import groupby
+import math
+from operator import itemgetter
+import sys
+import threading
+import weakref
+
+from . import get_package_link
+from . import get_sources
+from . import SkipPlatform
+from .config import load_config
+
+
+DEFAULT_LIMIT = 10
+"""The default number of results returned by a search."""
+
+_DENSE_SHARE = 128
+_MAX_SIZE_BITS = 64
+_FEW_NAMES = 16
+_EPSILON = 1e-9
+_NONZERO = bytes([0] + [1] * 255)
+_BYTE_BITS = [
+    tuple(bit for bit in range(8) if value >> bit & 1)
+    for value in range(256)]
+
+_trigram_indexes = weakref.WeakKeyDictionary()
+_trigram_indexes_lock = threading.Lock()
+
+
+def _trigrams(name):
+    padded = '  ' + name.lower() + ' '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _to_bits(name_ids, length):
+    buf = bytearray(length)
+    for name_id in name_ids:
+        buf[name_id >> 3] |= 1 << (name_id & 7)
+    return int.from_bytes(buf, 'little')
+
+
+def _enumerate_bits(bits, length):
+    # A few bits are found from the most significant one, and any others by
+    # scanning for the bytes which have any set
+    for _ in range(8):
+        if not bits:
+            return
+        name_id = bits.bit_length() - 1
+        yield name_id
+        bits ^= 1 << name_id
+    data = bits.to_bytes(length, 'little')
+    nonzero = data.translate(_NONZERO)
+    offset = nonzero.find(1)
+    while offset >= 0:
+        for bit in _BYTE_BITS[data[offset]]:
+            yield offset << 3 | bit
+        offset = nonzero.find(1, offset + 1)
+
+
+class TrigramIndex:
+    """
+    An index of package names by the trigrams they contain.
+
+    Names are ranked by the Jaccard similarity of their trigrams to those of
+    the query, and the results are the same as those of comparing the query
+    to every name.
+
+    The trigrams which are in at least one name in 128, such as those of a
+    'lib' prefix or '-dev' suffix, are recorded as a bit set over all of the
+    names. The others are recorded as a list of the names which contain them.
+    """
+
+    def __init__(self, names):
+        self._names = []
+        self._sizes = array('H')
+        postings = {}
+        # A name may be enumerated more than once, such as for both a binary
+        # and a virtual package
+        seen = set()
+        for name in names:
+            if name in seen:
+                continue
+            seen.add(name)
+            name_id = len(self._names)
+            self._names.append(str(name))
+            trigrams = _trigrams(name)
+            self._sizes.append(min(len(trigrams), 0xFFFF))
+            for trigram in trigrams:
+                trigram_postings = postings.get(trigram)
+                if trigram_postings is None:
+                    trigram_postings = postings[trigram] = array('I')
+                trigram_postings.append(name_id)
+
+        self._length = (len(self._names) + 7) // 8
+        self._all = (1 << len(self._names)) - 1
+        self._postings = {}
+        self._dense = {}
+        for trigram, trigram_postings in postings.items():
+            if len(trigram_postings) * _DENSE_SHARE >= len(self._names):
+                self._dense[trigram] = _to_bits(
+                    trigram_postings, self._length)
+            else:
+                self._postings[trigram] = trigram_postings
+
+        # The names with at most each number of trigrams
+        by_size = [[] for _ in range(_MAX_SIZE_BITS)]
+        for name_id, name_size in enumerate(self._sizes):
+            if name_size < _MAX_SIZE_BITS:
+                by_size[name_size].append(name_id)
+        self._max_size_bits = []
+        bits = 0
+        for name_ids in by_size:
+            bits |= _to_bits(name_ids, self._length)
+            self._max_size_bits.append(bits)
+
+    def __len__(self):
+        return len(self._names)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        Find the names which are most similar to a query.
+
+        :param query: the name to search for.
+        :param limit: the maximum number of names to return.
+
+        :returns: a list of tuples of similarity and name, most similar first.
+          Names with the same similarity are listed in the order they were
+          indexed, and names which share no trigram with the query are never
+          returned.
+        """
+        if limit < 1:
+            return []
+        return [
+            (similarity, self._names[-negative_id])
+            for similarity, negative_id in _Search(self, query, limit).run()
+        ]
+
+    def _size_bits(self, max_size):
+        if max_size >= _MAX_SIZE_BITS:
+            return self._all
+        return self._max_size_bits[max_size] if max_size >= 0 else 0
+
+
+class _Search:
+    """
+    A search of a TrigramIndex for the names most similar to a query.
+
+    The dense trigrams of the query are counted for all names at once, by
+    adding their bit sets into a binary counter whose digits are bit sets.
+    The names with each count can then be found using bit operations. The
+    rare trigrams are counted one name at a time.
+
+    The names which contain the same number of rare trigrams are ranked
+    together, most first. A name can only be more similar than the worst
+    result if it contains enough trigrams of the query, and isn't too long
+    for the number it contains. The names which meet both conditions for
+    each count of dense trigrams are found using bit operations, and only
+    those are visited. The results are seeded with the shortest names with
+    the most dense trigrams, so that the conditions apply from the start.
+    """
+
+    def __init__(self, index, query, limit):
+        self._index = index
+        self._limit = limit
+        self._results = []
+        self._seeded = set()
+        self._counts = Counter()
+        # The digits of the number of dense trigrams each name shares with
+        # the query, least significant first
+        self._digits = []
+        query_trigrams = _trigrams(query)
+        self._size = len(query_trigrams)
+        dense = 0
+        for trigram in query_trigrams:
+            bits = index._dense.get(trigram)
+            if bits is None:
+                self._counts.update(index._postings.get(trigram, ()))
+                continue
+            dense += 1
+            for i, digit in enumerate(self._digits):
+                self._digits[i] = digit ^ bits
+                bits &= digit
+                if not bits:
+                    break
+            else:
+                self._digits.append(bits)
+        self._top = min(dense, (1 << len(self._digits)) - 1)
+        self._digit_bytes = None
+        self._levels = {}
+
+    def run(self):
+        """
+        Rank the names.
+
+        :returns: a list of tuples of similarity and negated name ID, most
+          similar first.
+        """
+        self._seed()
+        for sparse, group in groupby(
+                self._counts.most_common(), key=itemgetter(1)):
+            if not self._rank(sparse, [name_id for name_id, _ in group]):
+                break
+        else:
+            self._rank(0, None)
+        return sorted(self._results, reverse=True)
+
+    def _seed(self):
+        index = self._index
+        for shared in range(self._top, 0, -1):
+            names = self._level(shared)
+            name_size = shared
+            while names:
+                visit = names & index._size_bits(name_size)
+                names ^= visit
+                name_size += 1
+                for name_id in _enumerate_bits(visit, index._length):
+                    self._seeded.add(name_id)
+                    self._push(name_id, self._counts.get(name_id, 0))
+                    if len(self._results) == self._limit:
+                        return
+
+    def _rank(self, sparse, name_ids):
+        # Rank the names which contain the given number of rare trigrams,
+        # which are listed unless there are none
+        index = self._index
+        size = self._size
+        if len(self._results) < self._limit:
+            # Every name which shares a dense trigram was seeded
+            names = self._level(0) if sparse else 0
+        else:
+            worst = self._results[0][0]
+            needed = math.ceil(worst * size - _EPSILON)
+            if sparse + self._top < needed:
+                return False
+            names = 0
+            for shared in range(
+                    self._top, max(needed - sparse, 0 if sparse else 1) - 1,
+                    -1):
+                max_size = int(
+                    (sparse + shared) / worst - size + sparse + shared +
+                    _EPSILON)
+                names |= self._level(shared) & index._size_bits(max_size)
+        counts = self._counts
+        seeded = self._seeded
+        data = None
+        if name_ids is not None and len(name_ids) > _FEW_NAMES:
+            data = names.to_bytes(index._length, 'little')
+            if index._length - data.count(0) < len(name_ids):
+                data = None
+                name_ids = None
+        if name_ids is None:
+            for name_id in _enumerate_bits(names, index._length):
+                if name_id not in seeded and \
+                        counts.get(name_id, 0) == sparse:
+                    self._push(name_id, sparse)
+        elif data is None:
+            for name_id in name_ids:
+                if names >> name_id & 1 and name_id not in seeded:
+                    self._push(name_id, sparse)
+        else:
+            for name_id in name_ids:
+                if data[name_id >> 3] >> (name_id & 7) & 1 and \
+                        name_id not in seeded:
+                    self._push(name_id, sparse)
+        return True
+
+    def _level(self, count):
+        # The names which share the given number of dense trigrams
+        names = self._levels.get(count)
+        if names is None:
+            everything = self._index._all
+            names = everything
+            for i, digit in enumerate(self._digits):
+                names &= digit if count >> i & 1 else everything ^ digit
+                if not names:
+                    break
+            self._levels[count] = names
+        return names
+
+    def _push(self, name_id, shared):
+        if self._digit_bytes is None:
+            self._digit_bytes = [
+                digit.to_bytes(self._index._length, 'little')
+                for digit in self._digits]
+        offset = name_id >> 3
+        bit = name_id & 7
+        for i, digit in enumerate(self._digit_bytes):
+            shared += (digit[offset] >> bit & 1) << i
+        result = (
+            shared / (self._size + self._index._sizes[name_id] - shared),
+            -name_id)
+        if len(self._results) < self._limit:
+            heapq.heappush(self._results, result)
+        elif result > self._results[0]:
+            heapq.heapreplace(self._results, result)
+
+
+def get_trigram_index(cache):
+    """
+    Get the trigram index of the package names in a repository.
+
+    The index is built the first time it is requested for a repository, by
+    enumerating every package in the repository once.
+
+    :param cache: the RepositoryCache of the repository.
+
+    :returns: the TrigramIndex instance, which is shared by all callers.
+    """
+    with _trigram_indexes_lock:
+        entry = _trigram_indexes.get(cache)
+        if entry is None:
+            entry = _trigram_indexes[cache] = [threading.Lock(), None]
+    with entry[0]:
+        if entry[1] is None:
+            entry[1] = TrigramIndex(cache)
+        return entry[1]
+
+
+def search_packages(
+    config, query, os_name, os_code_name, os_arch, limit=DEFAULT_LIMIT,
+):
+    """
+    Find the packages with names most similar to a query for a platform.
+
+    :param config: the parsed YAML configuration.
+    :param query: the name to search for.
+    :param os_name: the name of the OS associated with the packages.
+    :param os_code_name: the OS version associated with the packages.
+    :param os_arch: the system architecture associated with the packages.
+    :param limit: the maximum number of packages to return.
+
+    :returns: a list of tuples of similarity and package entry, most similar
+      first.
+    """
+    if os_name not in config['package_sources']:
+        return []
+
+    results = []
+    for source in get_sources(config, os_name, os_code_name):
+        cache = source.enumerate_packages(os_name, os_code_name, os_arch)
+        for similarity, name in get_trigram_index(cache).search(query, limit):
+            results.append((similarity, len(results), name, cache))
+    results.sort(key=lambda result: (-result[0], result[1]))
+
+    found = []
+    seen = set()
+    for similarity, _, name, cache in results:
+        if name in seen:
+            continue
+        seen.add(name)
+        found.append((similarity, cache.lookup(name)))
+        if len(found) == limit:
+            break
+    return found
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m rosdep_repo_check.search',
+        description='Find packages with names similar to a query')
+    parser.add_argument('os_name', help='the name of the OS to search')
+    parser.add_argument('query', help='the package name to search for')
+    parser.add_argument(
+        '--os-code-name',
+        help='the OS version to search (default: the newest supported)')
+    parser.add_argument(
+        '--os-arch',
+        help='the architecture to search (default: the first supported)')
+    parser.add_argument(
+        '-k', '--limit', type=int, default=DEFAULT_LIMIT,
+        help='the maximum number of results')
+    args = parser.parse_args(argv)
+
+    config = load_config()
+    if args.os_name not in config['supported_versions']:
+        print("Unsupported OS '%s'" % args.os_name, file=sys.stderr)
+        return 1
+    os_code_name = \
+        args.os_code_name or config['supported_versions'][args.os_name][-1]
+    os_arch = args.os_arch or config['supported_arches'][args.os_name][0]
+
+    try:
+        results = search_packages(
+            config, args.query, args.os_name, os_code_name, os_arch,
+            args.limit)
+    except SkipPlatform as e:
+        print(str(e) + ': ' + str(e.__cause__), file=sys.stderr)
+        return 1
+    for similarity, pkg in results:
+        print('%.2f %s %s' % (
+            similarity, pkg.name, get_package_link(
+                config, pkg, args.os_name, os_code_name, os_arch)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,334 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+from contextvars import ContextVar
+import http.client
+import io
+import os
+import socket
+import ssl
+import threading
+from urllib.error import HTTPError
+from urllib.error import URLError
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+from urllib.request import getproxies
+from urllib.request import proxy_bypass
+from urllib.request import Request
+from urllib.request import urlopen
+
+
+DEFAULT_MAX_CONNECTIONS = 6
+"""The default number of concurrent connections to a single host."""
+
+_MAX_REDIRECTS = 10
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+_current_group = ContextVar('current_group', default=None)
+
+
+def get_max_connections():
+    """
+    Get the maximum number of concurrent connections to a single host.
+
+    The limit is configured using the ROSDEP_REPO_CHECK_MAX_CONNECTIONS
+    environment variable.
+
+    :returns: the maximum number of connections.
+    """
+    return int(os.environ.get(
+        'ROSDEP_REPO_CHECK_MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS))
+
+
+class RequestGroup:
+    """
+    Requests made by a task which may be abandoned by another thread.
+
+    The connections used by requests made through the session while running in
+    the group are tracked until their responses are released. Aborting the
+    group shuts down those connections, so that a thread which is blocked on
+    one of them fails promptly and releases its request slot, and any later
+    request made in the group fails immediately.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = set()
+        self._aborted = False
+
+    def run(self, func, *args):
+        """
+        Call a function with requests made by it tracked by this group.
+
+        :param func: the function to call.
+        :param args: the arguments to call the function with.
+
+        :returns: the return value of the function.
+        """
+        token = _current_group.set(self)
+        try:
+            return func(*args)
+        finally:
+            _current_group.reset(token)
+
+    def abort(self):
+        """Shut down the connections of all requests in the group."""
+        with self._lock:
+            self._aborted = True
+            connections = list(self._connections)
+        for conn in connections:
+            sock = conn.sock
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    def _add(self, conn):
+        with self._lock:
+            if self._aborted:
+                raise ConnectionAbortedError('The request was aborted')
+            self._connections.add(conn)
+
+    def _discard(self, conn):
+        with self._lock:
+            self._connections.discard(conn)
+
+
+class _HostPool:
+
+    def __init__(self, max_connections):
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.idle = []
+
+
+class _SessionResponse(io.RawIOBase):
+    """
+    Response which returns its connection to the pool once it is consumed.
+
+    This class mimics the parts of the urllib response interface which are
+    used by this package. A connection is only re-used if the response body
+    was read to completion and the server did not ask for it to be closed.
+    The response holds one of the host's request slots until it is consumed
+    or closed, or until it is garbage collected if it was abandoned.
+    """
+
+    def __init__(self, release, response, url):
+        self._release = release
+        self._response = response
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    @property
+    def length(self):
+        return self._response.length
+
+    def getheader(self, name, default=None):
+        return self._response.getheader(name, default)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self._response.readinto(b)
+        if not n and len(b):
+            self._finish(
+                self._response.isclosed() and not self._response.will_close)
+        return n
+
+    def _finish(self, reuse):
+        release, self._release = self._release, None
+        if release is not None:
+            release(reuse)
+
+    def close(self):
+        if self._release is not None:
+            # Unless the body was read to completion, the rest of it is still
+            # pending on the connection, so it can't be re-used
+            reuse = self._response.isclosed() and not self._response.will_close
+            self._response.close()
+            self._finish(reuse)
+        super().close()
+
+    def __del__(self):
+        self.close()
+
+
+class HTTPSession:
+    """
+    A pool of persistent HTTP connections shared by all requests.
+
+    Idle connections are kept open for each host, so that later requests to
+    the same host avoid establishing a new connection and TLS session. The
+    number of requests which may be in flight to a single host is limited, and
+    a request waits for one of them to complete before it is sent. A request
+    is complete once its response is consumed or closed, so responses must be
+    closed when they are abandoned.
+
+    Requests which must be sent through a proxy are made using urllib instead.
+    """
+
+    def __init__(self, max_connections=DEFAULT_MAX_CONNECTIONS):
+        self._max_connections = max_connections
+        self._lock = threading.Lock()
+        self._pools = {}
+        self._ssl_context = ssl.create_default_context()
+
+    def _get_pool(self, key):
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = _HostPool(self._max_connections)
+            return pool
+
+    def _connect(self, key, timeout):
+        scheme, host, port = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(
+                host, port, timeout=timeout, context=self._ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _send(self, key, pool, path, headers, timeout, group):
+        while True:
+            with self._lock:
+                conn = pool.idle.pop() if pool.idle else None
+            reused = conn is not None
+            if not reused:
+                conn = self._connect(key, timeout)
+            elif conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            conn.timeout = timeout
+            if group is not None:
+                try:
+                    group._add(conn)
+                except OSError:
+                    conn.close()
+                    raise
+            try:
+                conn.request('GET', path, headers=headers)
+                return conn, conn.getresponse()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                if group is not None:
+                    group._discard(conn)
+                # The server may have closed an idle connection
+                if not reused or (group is not None and group._aborted):
+                    raise
+
+    def _open_pooled(self, url, headers, timeout):
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        pool = self._get_pool(key)
+        group = _current_group.get()
+        pool.slots.acquire()
+        try:
+            conn, response = self._send(
+                key, pool, path, headers, timeout, group)
+        except (OSError, http.client.HTTPException) as e:
+            pool.slots.release()
+            raise URLError(e)
+        except BaseException:
+            pool.slots.release()
+            raise
+
+        def release(reuse):
+            if group is not None:
+                group._discard(conn)
+            if reuse:
+                with self._lock:
+                    reuse = len(pool.idle) < self._max_connections
+                    if reuse:
+                        pool.idle.append(conn)
+            if not reuse:
+                conn.close()
+            pool.slots.release()
+
+        return _SessionResponse(release, response, url)
+
+    def open(self, url, headers, timeout):
+        """
+        Make a GET request, following any redirects.
+
+        :param url: the URL to request.
+        :param headers: the request headers.
+        :param timeout: number of seconds to wait for the remote host to
+          respond.
+
+        :returns: a response-like object for streaming the response body.
+        :raises HTTPError: if the server responds with an error or
+          'Not Modified' status.
+        :raises URLError: if the request could not be sent.
+        """
+        for _ in range(_MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            if parts.scheme not in ('http', 'https') or (
+                parts.scheme in getproxies() and
+                not proxy_bypass(parts.hostname)
+            ):
+                return urlopen(Request(url, headers=headers), timeout=timeout)
+            response = self._open_pooled(url, headers, timeout)
+            location = response.getheader('Location')
+            if response.status in _REDIRECT_CODES and location:
+                response.read()
+                response.close()
+                url = urljoin(url, location)
+                continue
+            if response.status >= 300:
+                body = response.read()
+                response.close()
+                raise HTTPError(
+                    url, response.status, response.reason, response.headers,
+                    io.BytesIO(body))
+            return response
+        raise HTTPError(
+            url, response.status, 'Too many redirects', response.headers,
+            None)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Get the HTTP session shared by all requests.
+
+    :returns: the HTTPSession instance.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = HTTPSession(get_max_connections())
+        return _session
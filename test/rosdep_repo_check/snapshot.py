@@ -0,0 +1,229 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+
+from .cache import get_cache_dir
+from .cache import write_file_atomic
+
+
+_MAGIC = b'RRCIDX01'
+_HEADER = struct.Struct('<8sII')
+_RECORD = struct.Struct('<IIIII')
+_LENGTH = struct.Struct('<I')
+_NONE = 0xFFFFFFFF
+
+
+def get_snapshot_max_age():
+    """
+    Get the maximum age of snapshots which can be used in place of a download.
+
+    The age (in seconds) is configured using the
+    ROSDEP_REPO_CHECK_SNAPSHOT_MAX_AGE environment variable, and defaults to 0,
+    which disables the re-use of snapshots based on their age.
+
+    :returns: the maximum age in seconds.
+    """
+    return float(os.environ.get('ROSDEP_REPO_CHECK_SNAPSHOT_MAX_AGE', 0))
+
+
+def get_snapshot_path(key, os_name, os_code_name, os_arch):
+    """
+    Get the path of the snapshot for a repository collection and platform.
+
+    :param key: a string which uniquely identifies the repository collection.
+    :param os_name: the name of the OS associated with the repository.
+    :param os_code_name: the OS version associated with the repository.
+    :param os_arch: the system architecture associated with the repository.
+
+    :returns: the path to the snapshot, or None if caching is disabled.
+    """
+    cache_dir = get_cache_dir()
+    if not cache_dir:
+        return None
+    digest = hashlib.sha256('\n'.join(
+        (key, os_name, os_code_name, os_arch)).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, 'snapshots', digest + '.idx')
+
+
+def write_snapshot(path, entries, metadata):
+    """
+    Write package entries to a sorted, memory-mappable snapshot file.
+
+    :param path: the path of the snapshot file to write.
+    :param entries: the package entries to write.
+    :param metadata: a JSON-serializable mapping to store in the snapshot.
+    """
+    strings = bytearray()
+    string_offsets = {}
+
+    def add_string(value):
+        if value is None:
+            return _NONE
+        offset = string_offsets.get(value)
+        if offset is None:
+            offset = string_offsets[value] = len(strings)
+            encoded = value.encode('utf-8')
+            strings.extend(_LENGTH.pack(len(encoded)))
+            strings.extend(encoded)
+        return offset
+
+    records = []
+    for pkg in entries:
+        # Entries for binary packages sort before virtual packages
+        sort_key = (pkg.name.encode('utf-8'), pkg.binary_name != pkg.name)
+        records.append((sort_key, (
+            add_string(pkg.name),
+            add_string(pkg.version),
+            add_string(pkg.url),
+            add_string(pkg.source_name),
+            add_string(pkg.binary_name),
+        )))
+    records.sort(key=lambda record: record[0])
+
+    encoded_metadata = json.dumps(metadata).encode('utf-8')
+    data = bytearray(
+        _HEADER.pack(_MAGIC, len(encoded_metadata), len(records)))
+    data.extend(encoded_metadata)
+    for _, offsets in records:
+        data.extend(_RECORD.pack(*offsets))
+    data.extend(strings)
+    write_file_atomic(path, data)
+
+
+class Snapshot:
+    """
+    A read-only package index backed by a memory-mapped snapshot file.
+
+    Packages are looked up using a binary search over the sorted records, so
+    the snapshot can be used without parsing it first. When a name is present
+    for both a binary and a virtual package, the binary package is found.
+    """
+
+    def __init__(self, path):
+        # Deferred to avoid a circular import with the package
+        from . import PackageEntry
+        self._package_entry = PackageEntry
+
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, metadata_length, self._count = _HEADER.unpack_from(self._mm)
+        if magic != _MAGIC:
+            raise ValueError('Invalid snapshot file: ' + path)
+        self._records_start = _HEADER.size + metadata_length
+        self._strings_start = \
+            self._records_start + self._count * _RECORD.size
+        self.metadata = json.loads(
+            self._mm[_HEADER.size:self._records_start].decode('utf-8'))
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self._entry(index)
+
+    def _bytes(self, offset):
+        start = self._strings_start + offset + _LENGTH.size
+        length, = _LENGTH.unpack_from(self._mm, start - _LENGTH.size)
+        return self._mm[start:start + length]
+
+    def _string(self, offset):
+        if offset == _NONE:
+            return None
+        return self._bytes(offset).decode('utf-8')
+
+    def _name_offset(self, index):
+        name_offset, = _LENGTH.unpack_from(
+            self._mm, self._records_start + index * _RECORD.size)
+        return name_offset
+
+    def _entry(self, index):
+        offsets = _RECORD.unpack_from(
+            self._mm, self._records_start + index * _RECORD.size)
+        return self._package_entry(
+            *(self._string(offset) for offset in offsets))
+
+    def lookup(self, name):
+        """
+        Look up a package by name.
+
+        :param name: the name of the package to look up.
+
+        :returns: the first package entry with the given name, or None.
+        """
+        needle = name.encode('utf-8')
+        low = 0
+        high = self._count
+        while low < high:
+            mid = (low + high) // 2
+            if self._bytes(self._name_offset(mid)) < needle:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self._count and self._bytes(self._name_offset(low)) == needle:
+            return self._entry(low)
+        return None
+
+
+def load_snapshot(path, key, max_age, validator=None):
+    """
+    Open a snapshot if it is still valid.
+
+    :param path: the path of the snapshot file.
+    :param key: the key of the repository collection the snapshot must match.
+    :param max_age: the maximum number of seconds since the oldest source of
+      the snapshot was fetched.
+    :param validator: if given, the snapshot is valid regardless of its age if
+      it was built from repository metadata with the same validator.
+
+    :returns: the Snapshot instance, or None if it is absent or invalid.
+    """
+    if not path or not os.path.isfile(path):
+        return None
+    if validator is None and max_age <= 0:
+        return None
+    try:
+        snapshot = Snapshot(path)
+    except (OSError, ValueError) as e:
+        print("Ignoring unreadable snapshot '%s': %s" % (path, str(e)))
+        return None
+    if snapshot.metadata.get('key') != key:
+        return None
+    if validator is not None:
+        if snapshot.metadata.get('validator') != validator:
+            return None
+        return snapshot
+    fetched = [ts for _, ts in snapshot.metadata.get('sources', ())]
+    if not fetched or time.time() - min(fetched) > max_age:
+        return None
+    return snapshot
@@ -25,62 +25,247 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+from concurrent.futures import ThreadPoolExecutor
 import re
+import threading
+import weakref
 
-from . import find_package
+from . import get_sources
+from . import SkipPlatform
+from .search import search_packages
+from .verify import DEFAULT_PREFETCH_JOBS
+from .verify import prefetch_repositories
 
 
 _PYTHON_PATTERN = re.compile(r'^python(\d)-(.*)')
+_PYTHON_DIST_PATTERN = re.compile(r'^python(\d)(?:\.\d+)?dist\((.*)\)$')
+_WRAPPED_PATTERN = re.compile(r'^(?:cmake|pkgconfig)\((.*)\)$')
+_DIST_SEPARATOR_PATTERN = re.compile(r'[-_.]+')
 
+_SIMILAR_LIMIT = 5
 
-def make_suggestion(config, key, os_name):
+_name_indexes = weakref.WeakKeyDictionary()
+_name_indexes_lock = threading.Lock()
+
+
+def normalize_name(name):
     """
-    Attempt to find packages which may satisfy a key based on the name.
+    Reduce a package name to the form shared by its common variants.
 
-    This function uses heuristics to suggest OS packages which may satisfy a
-    key. Many of the heuristics do not apply to all platforms.
+    The name is lowercased, python packages and python dist provides are
+    reduced to the python version and normalized distribution name, cmake()
+    and pkgconfig() provides are unwrapped, and any -dev or -devel suffix and
+    lib prefix are removed.
 
-    :param config: the parsed YAML configuration.
-    :param key: the name of the unsatisfied key.
-    :param os_name: the name of the OS associated with the package.
+    :param name: the package name or key to normalize.
+
+    :returns: the normalized name.
     """
-    os_version = config['supported_versions'][os_name][-1]
-    os_arch = config['supported_arches'][os_name][0]
-    # 1) Check for verbatim key
-    suggestion = find_package(config, key, os_name, os_version, os_arch)
-    if suggestion:
-        print("Suggesting '%s' package for %s" % (suggestion.binary_name, os_name))
-        return suggestion
-    else:
-        print("No '%s' package for %s %s (%s). Looking for variants..." % (
-            key, os_name, os_version, os_arch))
-    # 2) Try -devel in place of -dev
+    name = name.lower()
+    match = _PYTHON_DIST_PATTERN.match(name) or _PYTHON_PATTERN.match(name)
+    if match:
+        return 'python%s-%s' % (
+            match.group(1), _DIST_SEPARATOR_PATTERN.sub('-', match.group(2)))
+    match = _WRAPPED_PATTERN.match(name)
+    if match:
+        name = match.group(1)
+    for suffix in ('-devel', '-dev'):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    if name.startswith('lib') and len(name) > 3:
+        name = name[3:]
+    return name
+
+
+def _enumerate_variants(key):
+    """Enumerate the names tried by the heuristics, most preferred first."""
+    yield key
+    # 1) Try -devel in place of -dev
     if key.endswith('-dev'):
-        suggestion = make_suggestion(config, key[:-4] + '-devel', os_name)
-        if suggestion:
-            return suggestion
-    # 3) Try with 'lib' prefix
+        yield from _enumerate_variants(key[:-4] + '-devel')
+    # 2) Try without 'lib' prefix
     if key.startswith('lib'):
-        suggestion = make_suggestion(config, key[3:], os_name)
-        if suggestion:
-            return suggestion
-    # 4) Try cmake(foo) and pkgconfig(foo)
+        yield from _enumerate_variants(key[3:])
+    # 3) Try cmake(foo) and pkgconfig(foo)
     if key.endswith('-devel'):
-        suggestion = make_suggestion(config, 'cmake(' + key[:-6] + ')', os_name)
-        if suggestion:
-            return suggestion
-        suggestion = make_suggestion(config, 'pkgconfig(' + key[:-6] + ')', os_name)
-        if suggestion:
-            return suggestion
-    # 5) Try python?dist(foo)
+        yield from _enumerate_variants('cmake(' + key[:-6] + ')')
+        yield from _enumerate_variants('pkgconfig(' + key[:-6] + ')')
+    # 4) Try python?dist(foo)
     py_match = _PYTHON_PATTERN.match(key)
     if py_match:
-        suggestion = make_suggestion(
-            config, 'python%sdist(%s)' % (py_match.group(1), py_match.group(2)), os_name)
-        if suggestion:
-            return suggestion
+        yield from _enumerate_variants(
+            'python%sdist(%s)' % (py_match.group(1), py_match.group(2)))
         if '-' in py_match.group(2):
-            suggestion = make_suggestion(
-                config, 'python%sdist(%s)' % (py_match.group(1), py_match.group(2).replace('-', '_')), os_name)
-            if suggestion:
-                return suggestion
+            yield from _enumerate_variants('python%sdist(%s)' % (
+                py_match.group(1), py_match.group(2).replace('-', '_')))
+
+
+class NameIndex:
+    """
+    An index of the packages in a repository by their normalized names.
+
+    The index is built the first time it is used, by enumerating every package
+    in the repository once.
+    """
+
+    def __init__(self, packages):
+        self._packages = packages
+        self._names = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        with self._lock:
+            if self._names is None:
+                names = {}
+                # A name may be enumerated more than once, such as for both a
+                # binary and a virtual package
+                for pkg in self._packages:
+                    variants = names.setdefault(normalize_name(pkg), [])
+                    if pkg not in variants:
+                        variants.append(str(pkg))
+                self._names = names
+        return self._names
+
+    def lookup(self, key):
+        """
+        Look up the packages which share a normalized name with a key.
+
+        :param key: the name of the unsatisfied key.
+
+        :returns: the names of the matching packages, in the order they
+          appear in the repository.
+        """
+        names = self._names if self._names is not None else self._build()
+        return names.get(normalize_name(key), ())
+
+
+def get_name_index(cache):
+    """
+    Get the normalized name index of a repository.
+
+    :param cache: the RepositoryCache of the repository.
+
+    :returns: the NameIndex instance, which is shared by all callers.
+    """
+    with _name_indexes_lock:
+        index = _name_indexes.get(cache)
+        if index is None:
+            index = _name_indexes[cache] = NameIndex(cache)
+        return index
+
+
+def make_suggestions(config, key, os_name):
+    """
+    Find packages which may satisfy a key based on the name, best first.
+
+    Packages are matched by their normalized name, so each of the heuristics
+    used to find variants of the key is resolved with a single lookup per
+    repository. Packages with the name of the key itself rank first, followed
+    by the variants in the order they are tried by make_suggestion(), and then
+    by any other packages with the same normalized name.
+
+    :param config: the parsed YAML configuration.
+    :param key: the name of the unsatisfied key.
+    :param os_name: the name of the OS associated with the package.
+
+    :returns: a list of package entries.
+    """
+    if os_name not in config['package_sources']:
+        return []
+    os_version = config['supported_versions'][os_name][-1]
+    os_arch = config['supported_arches'][os_name][0]
+
+    variants = {}
+    for variant in _enumerate_variants(key):
+        variants.setdefault(variant, len(variants))
+    ranked = {}
+    for source_rank, source in enumerate(
+            get_sources(config, os_name, os_version)):
+        cache = source.enumerate_packages(os_name, os_version, os_arch)
+        for name in get_name_index(cache).lookup(key):
+            rank = (variants.get(name, len(variants)), source_rank)
+            if name not in ranked or rank < ranked[name][0]:
+                ranked[name] = (rank, cache)
+    return [
+        cache.lookup(name)
+        for name, (_, cache) in sorted(
+            ranked.items(), key=lambda item: item[1][0])
+    ]
+
+
+def make_suggestion(config, key, os_name):
+    """
+    Attempt to find packages which may satisfy a key based on the name.
+
+    This function uses heuristics to suggest OS packages which may satisfy a
+    key. Many of the heuristics do not apply to all platforms. If none of them
+    find a package, the packages with the most similar names are listed in
+    the messages instead.
+
+    :param config: the parsed YAML configuration.
+    :param key: the name of the unsatisfied key.
+    :param os_name: the name of the OS associated with the package.
+
+    :returns: a tuple of the best matching package entry (or None) and a list
+      of messages describing the outcome of the search.
+    """
+    suggestions = make_suggestions(config, key, os_name)
+    if suggestions:
+        return suggestions[0], [
+            "Suggesting '%s' package for %s on %s" % (
+                suggestions[0].binary_name, key, os_name)]
+    messages = ["No '%s' package or variant for %s" % (key, os_name)]
+    if os_name in config['package_sources']:
+        similar = search_packages(
+            config, key, os_name, config['supported_versions'][os_name][-1],
+            config['supported_arches'][os_name][0], _SIMILAR_LIMIT)
+        if similar:
+            messages.append('Packages with similar names: ' + ', '.join(
+                pkg.name for _, pkg in similar))
+    return None, messages
+
+
+def make_suggestion_batch(config, queries, jobs=DEFAULT_PREFETCH_JOBS):
+    """
+    Attempt to find packages which may satisfy several keys concurrently.
+
+    The repositories of every OS are downloaded and parsed concurrently
+    before any suggestions are made, and repositories which have already been
+    enumerated using the same configuration are re-used. Nothing is printed,
+    so that the outcome of each query can be reported in order.
+
+    :param config: the parsed YAML configuration.
+    :param queries: tuples of the name of an unsatisfied key and the name of
+      the OS to find a package for.
+    :param jobs: the maximum number of repositories to process concurrently.
+
+    :returns: a list of tuples in the same order as the queries, of:
+        - rosdep key
+        - OS name
+        - the best matching package entry (or None), or the SkipPlatform
+          exception raised for the OS
+        - a list of messages describing the outcome of the search
+    """
+    queries = list(queries)
+    prefetch_repositories(config, {
+        (os_name,
+         config['supported_versions'][os_name][-1],
+         config['supported_arches'][os_name][0])
+        for _, os_name in queries
+        if os_name in config['package_sources']
+    }, jobs)
+
+    def suggest(key, os_name):
+        try:
+            return make_suggestion(config, key, os_name)
+        except SkipPlatform as e:
+            return e, []
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(suggest, key, os_name)
+            for key, os_name in queries]
+        return [
+            (key, os_name) + future.result()
+            for (key, os_name), future in zip(queries, futures)]
@@ -0,0 +1,82 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import time
+
+from . import cache
+from .cache import HTTPCache
+
+
+def _add(http_cache, tmp_path, content):
+    path = tmp_path / 'download'
+    path.write_bytes(content)
+    digest = '%064x' % len(content)
+    http_cache.commit('http://example.com/%d' % len(content), str(path),
+                      digest, {})
+    return http_cache._object_path(digest)
+
+
+def test_evict_least_recently_used(tmp_path):
+    http_cache = HTTPCache(str(tmp_path / 'http'), 100)
+    paths = [_add(http_cache, tmp_path, b'x' * size) for size in (40, 41)]
+    os.utime(paths[0], (1, 1))
+    paths.append(_add(http_cache, tmp_path, b'x' * 42))
+    assert [os.path.exists(path) for path in paths] == [False, True, True]
+    assert http_cache._size == 83
+
+
+def test_evict_scans_only_over_limit(tmp_path, monkeypatch):
+    http_cache = HTTPCache(str(tmp_path / 'http'), 100)
+    _add(http_cache, tmp_path, b'x' * 10)
+
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(
+        cache.os, 'scandir', lambda path: scans.append(path) or scandir(path))
+    _add(http_cache, tmp_path, b'x' * 20)
+    _add(http_cache, tmp_path, b'x' * 30)
+    assert not scans
+    _add(http_cache, tmp_path, b'x' * 50)
+    assert scans
+    assert http_cache._size == 80
+
+
+def test_evict_removes_stale_tmp(tmp_path):
+    http_cache = HTTPCache(str(tmp_path / 'http'), 100)
+    os.makedirs(http_cache.tmp_dir)
+    stale = os.path.join(http_cache.tmp_dir, 'stale')
+    fresh = os.path.join(http_cache.tmp_dir, 'fresh')
+    for path in (stale, fresh):
+        with open(path, 'wb') as f:
+            f.write(b'partial')
+    old = time.time() - cache._STALE_TMP_AGE - 60
+    os.utime(stale, (old, old))
+    _add(http_cache, tmp_path, b'x' * 10)
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
@@ -0,0 +1,208 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import bz2
+import gzip
+import hashlib
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import io
+import os
+import threading
+
+import pytest
+
+from .benchmark import generate_deb_packages_file
+from .deb import deb_base_url
+from .deb import get_packages_location
+from .deb import get_release_index
+from .deb import open_packages_file
+from .deb import parse_blocks
+from .deb import parse_projected_blocks
+
+_FIELDS = ('Package', 'Version', 'Filename', 'Depends')
+
+# Stanzas which exercise the less common parts of the format
+_STANZAS = (
+    b'Package: folded\n'
+    b'Version: 1.0\n'
+    b'Depends:\n'
+    b' libfoo,\n'
+    b'\tlibbar (>= 2)\n'
+    b'Installed-Size: 12\n'
+    b'\n'
+    b'Package: prefixed\n'
+    b'Package-Type: udeb\n'
+    b'Description: mentions\n'
+    b' Version: 2.0\n'
+    b'Filename: pool/p/prefixed.udeb\n'
+    b'\n'
+    b'\n'
+    b'Package: minimal\n'
+    b'Version: no trailing newline')
+
+_EXPECTED = [
+    {
+        'Package': 'folded', 'Version': '1.0',
+        'Depends': 'libfoo, libbar (>= 2)'},
+    {'Package': 'prefixed', 'Filename': 'pool/p/prefixed.udeb'},
+    {'Package': 'minimal', 'Version': 'no trailing newline'},
+]
+
+
+def test_parse_projected_blocks(chunk_size):
+    assert list(parse_projected_blocks(
+        io.BytesIO(_STANZAS), _FIELDS, chunk_size)) == _EXPECTED
+
+
+def test_parse_projected_blocks_split(split_streams):
+    for f in split_streams(_STANZAS):
+        assert list(parse_projected_blocks(f, _FIELDS)) == _EXPECTED
+
+
+@pytest.mark.parametrize('data', (b'', b'\n', b'\n\n\n'))
+def test_parse_projected_blocks_empty(data):
+    assert list(parse_projected_blocks(io.BytesIO(data), _FIELDS)) == []
+
+
+def test_parse_projected_blocks_generated():
+    data = gzip.decompress(generate_deb_packages_file(200))
+    fields = ('Package', 'Version', 'Filename', 'Source', 'Provides')
+    expected = [
+        {field: value for field, value in block.items() if field in fields}
+        for block in parse_blocks(io.BytesIO(data))]
+    assert len(expected) == 200
+    assert list(parse_projected_blocks(io.BytesIO(data), fields)) == expected
+
+
+_PACKAGES = b'Package: foo\nVersion: 1.0\nFilename: pool/foo_1.0.deb\n'
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        body = self.server.files.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv('ROSDEP_REPO_CHECK_CACHE_DIR', '')
+    get_release_index.cache_clear()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.daemon_threads = True
+    server.requests = []
+    server.files = {}
+    server.base_url = 'http://127.0.0.1:%d/' % server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    get_release_index.cache_clear()
+
+
+def _publish(server, files, by_hash):
+    release = b'Suite: stable\n'
+    if by_hash:
+        release += b'Acquire-By-Hash: yes\n'
+    release += b'SHA256:\n'
+    for name, data in files.items():
+        release += b' %s %d main/binary-amd64/%s\n' % (
+            hashlib.sha256(data).hexdigest().encode(), len(data),
+            name.encode())
+        server.files['/dists/stable/main/binary-amd64/' + name] = data
+    server.files['/dists/stable/Release'] = release
+
+
+def test_packages_location_bz2(server):
+    data = bz2.compress(_PACKAGES)
+    _publish(server, {'Packages.bz2': data}, False)
+    url, compression, digest = get_packages_location(
+        server.base_url, 'main', 'stable', 'amd64')
+    assert url.endswith('/main/binary-amd64/Packages.bz2')
+    assert compression == 'bz2'
+    assert digest == hashlib.sha256(data).hexdigest()
+
+
+def test_by_hash_falls_back_to_canonical_name(server):
+    data = gzip.compress(_PACKAGES)
+    _publish(server, {'Packages.gz': data}, True)
+    url, f = open_packages_file(server.base_url, 'main', 'stable', 'amd64')
+    with f:
+        assert f.read() == _PACKAGES
+    assert url.endswith('/main/binary-amd64/Packages.gz')
+    digest = hashlib.sha256(data).hexdigest()
+    assert server.requests[-2:] == [
+        '/dists/stable/main/binary-amd64/by-hash/SHA256/' + digest,
+        '/dists/stable/main/binary-amd64/Packages.gz']
+
+
+def test_by_hash_fallback_is_verified(server):
+    _publish(server, {'Packages.gz': gzip.compress(_PACKAGES)}, True)
+    server.files['/dists/stable/main/binary-amd64/Packages.gz'] = \
+        gzip.compress(_PACKAGES + b'Depends: bar\n')
+    with pytest.raises(RuntimeError, match='SHA256 mismatch'):
+        open_packages_file(server.base_url, 'main', 'stable', 'amd64')
+
+
+def _enumerate_names(server):
+    collection = deb_base_url(server.base_url, 'main')
+    return [
+        pkg.name for pkg in collection.enumerate_packages(
+            'ubuntu', 'stable', 'amd64')]
+
+
+def test_snapshot_validated_by_digest(server, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv('ROSDEP_REPO_CHECK_CACHE_DIR', str(tmp_path))
+    _publish(server, {'Packages.gz': gzip.compress(_PACKAGES)}, False)
+    assert _enumerate_names(server) == ['foo']
+    assert 'Using snapshot' not in capsys.readouterr().out
+    assert _enumerate_names(server) == ['foo']
+    assert 'Using snapshot' in capsys.readouterr().out
+
+
+def test_snapshot_without_validator(server, tmp_path, monkeypatch):
+    monkeypatch.setenv('ROSDEP_REPO_CHECK_CACHE_DIR', str(tmp_path))
+    server.files['/dists/stable/main/binary-amd64/Packages.gz'] = \
+        gzip.compress(_PACKAGES)
+    assert _enumerate_names(server) == ['foo']
+    # Without a Release file, the snapshot could only be used based on its
+    # age, which is disabled
+    assert not os.path.exists(str(tmp_path / 'snapshots'))
@@ -0,0 +1,98 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import io
+import json
+import random
+
+import pytest
+
+from .layer_index import iterate_json_array
+
+_DOCUMENTS = (
+    '[]',
+    ' \n[ ]\n',
+    '[{}, [], {"a": {}, "b": []}]',
+    '[1,2 , 3]',
+    '[-12.5e-3, 1E+10, 0, 123456789012345678901234567890]',
+    '[true, false, null, "null", ""]',
+    '["café", "\\u00e9\\n\\"", "\U0001f916", "a,b]c"]',
+    '[{"id": 1, "pn": "foo", "layerbranch": 10, "nested": [1, {"a": []}]},'
+    ' [[], [[]]], {"": 3.25}]',
+)
+
+
+def _generate_recipes(count):
+    rng = random.Random(0)
+    return json.dumps([
+        {
+            'id': i,
+            'pn': 'recipe-%d' % i,
+            'pv': '%d.%d' % (rng.randrange(10), rng.randrange(100)),
+            'layerbranch': rng.randrange(50),
+            'provides': ' '.join(
+                'virtual/p%d' % rng.randrange(1000)
+                for _ in range(rng.randrange(3))),
+            'summary': 'Recipe é number %d' % i,
+        }
+        for i in range(count)], indent=1)
+
+
+def test_iterate_json_array(chunk_size):
+    for document in _DOCUMENTS:
+        data = document.encode('utf-8')
+        assert list(iterate_json_array(io.BytesIO(data), chunk_size)) == \
+            json.loads(document), document
+
+
+def test_iterate_json_array_split(split_streams):
+    for document in _DOCUMENTS:
+        data = document.encode('utf-8')
+        for f in split_streams(data):
+            assert list(iterate_json_array(f)) == json.loads(document), \
+                document
+
+
+def test_iterate_json_array_generated():
+    document = _generate_recipes(200)
+    assert list(iterate_json_array(io.BytesIO(document.encode('utf-8')))) == \
+        json.loads(document)
+
+
+@pytest.mark.parametrize('document', (
+    '{"a": 1}',
+    '',
+    '[1, 2',
+    '[1, 2,',
+    '["abc',
+    '[{"a": []}',
+    '[1, tru]',
+))
+def test_iterate_json_array_invalid(document, chunk_size):
+    with pytest.raises(ValueError):
+        list(iterate_json_array(
+            io.BytesIO(document.encode('utf-8')), chunk_size))
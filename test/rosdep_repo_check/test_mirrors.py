@@ -0,0 +1,112 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+from concurrent.futures import ThreadPoolExecutor
+import functools
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import threading
+import time
+
+import pytest
+
+from . import rpm
+from .mirrors import FAILURE_LATENCY
+from .mirrors import MirrorStats
+from .mirrors import race
+from .session import get_session
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/mirrorlist':
+            body = ''.join(
+                'http://127.0.0.1:%d/mirror%d/\n' % (
+                    self.server.server_address[1], i)
+                for i in range(3)).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self.server.requests.append(self.path)
+        # Mirrors never answer, and the connection is only closed once the
+        # client gives up on it
+        self.rfile.read(1)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv('ROSDEP_REPO_CHECK_CACHE_DIR', '')
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.daemon_threads = True
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _probe(url):
+    with get_session().open(url, {}, 30) as f:
+        return f.read()
+
+
+def test_race_aborts_abandoned_probes(server):
+    urls = [
+        'http://127.0.0.1:%d/mirror%d/' % (server.server_address[1], i)
+        for i in range(2)]
+    stats = MirrorStats(None)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        start = time.monotonic()
+        results, abandoned = race(urls, _probe, stats, executor, timeout=0.5)
+        assert not results
+        assert abandoned == urls
+        for url in urls:
+            assert stats.latency(url) == FAILURE_LATENCY
+        # The probes fail as soon as their connections are shut down, rather
+        # than when the request times out
+        executor.shutdown()
+        assert time.monotonic() - start < 10
+
+
+def test_mirrorlist_gives_up_on_hanging_mirrors(server, monkeypatch):
+    monkeypatch.setattr(rpm, 'race', functools.partial(rpm.race, timeout=0.5))
+    mirrorlist_url = 'http://127.0.0.1:%d/mirrorlist' % server.server_address[1]
+    with pytest.raises(RuntimeError, match='All mirrors were tried'):
+        list(rpm.enumerate_rpm_packages_from_mirrorlist(
+            mirrorlist_url, 'fedora', '40', 'x86_64'))
+    # Each mirror is probed at most twice
+    assert len(server.requests) == 6
@@ -0,0 +1,136 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import gzip
+import io
+import tarfile
+
+import pytest
+
+from .benchmark import generate_pacman_db
+from .pacman import enumerate_blocks
+from .pacman import enumerate_tar_members
+
+
+_MEMBERS = [
+    ('short', b'content'),
+    ('empty', b''),
+    ('block', b'x' * 512),
+    # Too long for the name field, so stored as a GNU long name, a pax path
+    # or a name prefix
+    ('dir/' + 'long-name-' * 12 + '/desc', b'a' * 1000),
+    ('d' * 90 + '/' + 'e' * 90, b'prefixed'),
+    ('caf\xe9/desc', b'unicode'),
+]
+
+
+def _make_tar(tar_format, members=_MEMBERS):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w', format=tar_format) as tf:
+        ti = tarfile.TarInfo('dir')
+        ti.type = tarfile.DIRTYPE
+        tf.addfile(ti)
+        ti = tarfile.TarInfo('link')
+        ti.type = tarfile.SYMTYPE
+        ti.linkname = 'short'
+        tf.addfile(ti)
+        for name, data in members:
+            ti = tarfile.TarInfo(name)
+            ti.size = len(data)
+            tf.addfile(ti, io.BytesIO(data))
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize('tar_format', (
+    tarfile.GNU_FORMAT, tarfile.USTAR_FORMAT, tarfile.PAX_FORMAT))
+def test_enumerate_tar_members(tar_format, chunk_size):
+    data = _make_tar(tar_format)
+    assert list(enumerate_tar_members(
+        io.BytesIO(data), lambda name: True, chunk_size)) == _MEMBERS
+    assert list(enumerate_tar_members(
+        io.BytesIO(data), lambda name: name.endswith('/desc'),
+        chunk_size)) == [_MEMBERS[3], _MEMBERS[5]]
+
+
+def test_enumerate_tar_members_empty():
+    assert list(enumerate_tar_members(
+        io.BytesIO(_make_tar(tarfile.GNU_FORMAT, [])),
+        lambda name: True)) == []
+
+
+def test_enumerate_tar_members_gnu_times():
+    ti = tarfile.TarInfo('name/desc')
+    ti.size = 4
+    header = bytearray(ti.tobuf(tarfile.GNU_FORMAT))
+    assert header[257:265] == b'ustar  \0'
+    # The access and change times overlap the POSIX name prefix
+    header[345:369] = b'%011o\0%011o\0' % (1700000000, 1700000001)
+    data = bytes(header) + b'desc'.ljust(512, b'\0') + bytes(1024)
+    assert list(enumerate_tar_members(
+        io.BytesIO(data), lambda name: True)) == [('name/desc', b'desc')]
+
+
+@pytest.mark.parametrize('size', (
+    # Within the header of a member, its content and a GNU long name
+    1024 + 100, 1536 + 3, 4096 + 10))
+def test_enumerate_tar_members_truncated(size):
+    data = _make_tar(tarfile.GNU_FORMAT)
+    with pytest.raises(RuntimeError):
+        list(enumerate_tar_members(
+            io.BytesIO(data[:size]), lambda name: True))
+
+
+_DESC = (
+    b'%FILENAME%\nfoo-1.0-1-x86_64.pkg.tar.zst\n\n'
+    b'%NAME%\nfoo\n\n'
+    b'%PROVIDES%\nfoo-virtual\nlibfoo.so=1-64\n\n')
+
+
+def test_enumerate_blocks():
+    data = _make_tar(tarfile.GNU_FORMAT, [
+        ('foo-1.0-1/desc', _DESC),
+        ('foo-1.0-1/files', b'%FILES%\nusr/bin/foo\n'),
+        ('empty-1.0-1/desc', b''),
+        ('bar-2.0-1/desc', b'%NAME%\nbar\n\n%DEPENDS%\n\n'),
+    ])
+    assert list(enumerate_blocks(io.BytesIO(data))) == [
+        {
+            '%FILENAME%': ['foo-1.0-1-x86_64.pkg.tar.zst'],
+            '%NAME%': ['foo'],
+            '%PROVIDES%': ['foo-virtual', 'libfoo.so=1-64'],
+        },
+        {'%NAME%': ['bar'], '%DEPENDS%': []},
+    ]
+
+
+def test_enumerate_blocks_generated():
+    data = gzip.decompress(generate_pacman_db(500))
+    blocks = list(enumerate_blocks(io.BytesIO(data)))
+    assert len(blocks) == 500
+    assert blocks[0]['%NAME%'] == ['libsource0-0-dev']
+    assert blocks[0]['%PROVIDES%'] == [
+        'libsource0-0-dev-virtual', 'liblibsource0-0-dev.so=1-64']
@@ -0,0 +1,134 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import difflib
+import gzip
+import io
+import random
+
+import pytest
+
+from .benchmark import generate_deb_packages_file
+from .deb import parse_blocks
+from .pdiff import apply_ed_script
+from .pdiff import parse_diff_index
+from .pdiff import parse_ed_script
+
+
+def _make_ed_script(old, new):
+    """Create an ed script like 'diff --ed' does, last change first."""
+    script = []
+    opcodes = difflib.SequenceMatcher(None, old, new, False).get_opcodes()
+    for tag, i1, i2, j1, j2 in reversed(opcodes):
+        if tag == 'equal':
+            continue
+        if tag == 'insert':
+            script.append(b'%da\n' % i1)
+        else:
+            address = b'%d' % (i1 + 1)
+            if i2 > i1 + 1:
+                address += b',%d' % i2
+            script.append(address + (b'd\n' if tag == 'delete' else b'c\n'))
+        if tag != 'delete':
+            script.extend(new[j1:j2])
+            script.append(b'.\n')
+    return b''.join(script)
+
+
+def _mutate(rng, lines):
+    lines = list(lines)
+    for _ in range(rng.randint(1, 20)):
+        pos = rng.randrange(len(lines) + 1)
+        action = rng.choice(('insert', 'delete', 'replace'))
+        if action != 'insert':
+            del lines[pos:pos + rng.randint(1, 5)]
+        if action != 'delete':
+            lines[pos:pos] = [
+                b'Line-%d: %d\n' % (pos, rng.randrange(1000))
+                for _ in range(rng.randint(1, 5))]
+    return lines
+
+
+def _patch(old, script):
+    commands = parse_ed_script(io.BytesIO(script))
+    dst = io.BytesIO()
+    apply_ed_script(io.BytesIO(b''.join(old)), commands, dst)
+    return dst.getvalue()
+
+
+def test_apply_ed_script():
+    old = gzip.decompress(
+        generate_deb_packages_file(100)).splitlines(keepends=True)
+    rng = random.Random(0)
+    for _ in range(50):
+        new = _mutate(rng, old)
+        assert _patch(old, _make_ed_script(old, new)) == b''.join(new)
+
+
+def test_apply_ed_script_edges():
+    old = [b'a\n', b'b\n', b'c\n']
+    for new in ([], [b'x\n'] + old, old + [b'x\n'], [b'b\n'], old):
+        assert _patch(old, _make_ed_script(old, new)) == b''.join(new)
+
+
+@pytest.mark.parametrize('script', (
+    b'1x\n',
+    b'1a\nfoo\n',
+    b'1d\n3d\n',
+    b'2,3c\nfoo\n.\n2d\n',
+))
+def test_parse_ed_script_invalid(script):
+    with pytest.raises(ValueError):
+        parse_ed_script(io.BytesIO(script))
+
+
+def test_apply_ed_script_missing_line():
+    commands = parse_ed_script(io.BytesIO(b'5d\n'))
+    with pytest.raises(ValueError):
+        apply_ed_script(io.BytesIO(b'a\nb\n'), commands, io.BytesIO())
+
+
+def test_parse_diff_index():
+    index = (
+        b'SHA256-Current: ' + b'c' * 64 + b' 1234\n'
+        b'SHA256-History:\n'
+        b' ' + b'a' * 64 + b' 1000 T-2024-01-01-0000.00\n'
+        b' ' + b'b' * 64 + b' 1100 T-2024-01-02-0000.00\n'
+        b'SHA256-Download:\n'
+        b' ' + b'd' * 64 + b' 100 T-2024-01-01-0000.00.gz\n'
+        b'X-Patch-Precedence: merged\n')
+    block = next(parse_blocks(io.BytesIO(index)))
+    current, history, downloads, merged = parse_diff_index(block)
+    assert current == 'c' * 64
+    assert history == [
+        ('a' * 64, 'T-2024-01-01-0000.00'),
+        ('b' * 64, 'T-2024-01-02-0000.00')]
+    assert downloads == {'T-2024-01-01-0000.00': 'd' * 64}
+    assert merged
+
+    with pytest.raises(ValueError):
+        parse_diff_index({})
@@ -0,0 +1,97 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import pytest
+
+from . import PackageEntry
+from . import PackageTable
+from . import RepositoryCache
+
+
+def _enumerate_packages():
+    yield PackageEntry('libfoo1', '1.0', 'http://example.com/libfoo1.deb')
+    yield PackageEntry(
+        'foo', None, 'http://example.com/foo-bin.deb', 'foo-bin', 'foo-bin')
+    yield PackageEntry('bar', '2.0', 'http://example.com/bar.deb')
+    yield PackageEntry('foo', '3.0', 'http://example.com/foo.deb')
+    yield PackageEntry(
+        'baz', None, 'http://example.com/bar.deb', 'bar', 'bar')
+
+
+def _describe(found):
+    return {name: (pkg.url, pkg.binary_name) for name, pkg in found.items()}
+
+
+def test_package_table_precedence():
+    table = PackageTable()
+    for pkg in _enumerate_packages():
+        assert table.add(pkg)
+    assert not table.add(PackageEntry('bar', '2.1', None))
+    assert table.get('foo').url == 'http://example.com/foo.deb'
+    assert table.get('baz').binary_name == 'bar'
+    assert table.get('qux') is None
+    assert sorted(table) == ['bar', 'baz', 'foo', 'foo', 'libfoo1']
+
+
+def test_lookup_prefers_binary_packages():
+    expected = {
+        'foo': ('http://example.com/foo.deb', 'foo'),
+        'baz': ('http://example.com/bar.deb', 'bar'),
+    }
+    names = ['foo', 'baz', 'qux']
+
+    # Streaming from the source
+    cache = RepositoryCache(_enumerate_packages())
+    assert _describe(cache.lookup_many(names)) == expected
+
+    # Partially streamed, with only the virtual package cached so far
+    cache = RepositoryCache(_enumerate_packages())
+    assert cache.lookup('bar').version == '2.0'
+    assert _describe(cache.lookup_many(names)) == expected
+
+    cache = RepositoryCache(_enumerate_packages())
+    assert cache.lookup('bar').version == '2.0'
+    assert cache.lookup('foo').version == '3.0'
+
+    # Fully prefetched
+    cache = RepositoryCache(_enumerate_packages())
+    cache.prefetch()
+    assert _describe(cache.lookup_many(names)) == expected
+    assert cache.lookup('foo').version == '3.0'
+    assert cache.lookup('qux') is None
+
+
+def test_lookup_deferred_error():
+    def enumerate_packages():
+        yield PackageEntry('foo', '1.0', None)
+        raise RuntimeError('truncated')
+
+    cache = RepositoryCache(enumerate_packages())
+    cache.prefetch()
+    assert cache.lookup('foo').version == '1.0'
+    with pytest.raises(RuntimeError, match='truncated'):
+        cache.lookup('bar')
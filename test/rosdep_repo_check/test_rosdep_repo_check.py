@@ -37,7 +37,7 @@ import yaml
 from . import get_package_link
 from . import SkipPlatform
 from .config import load_config
-from .suggest import make_suggestion
+from .suggest import make_suggestion_batch
 from .verify import verify_rules
 from .yaml import AnnotatedSafeLoader
 from .yaml import isolate_yaml_snippets_from_line_numbers
@@ -136,8 +136,8 @@ class TestRosdepRepositoryCheck(unittest.TestCase):
         assert not broken, 'New rules contain packages not present in repositories'
 
     def test_suggest_by_name(self):
+        queries = []
         for path, data in self._isolated_data.items():
-            print("Looking for name-based suggestions in '%s':" % path)
             for key in data.keys():
                 if key.endswith('-pip'):
                     # Ignore pip stuff to save time
@@ -147,24 +147,34 @@ class TestRosdepRepositoryCheck(unittest.TestCase):
                 rules = self._full_data[path][key]
                 missing_os_names = set(
                     self._config['supported_versions'].keys()).difference(rules.keys())
-                for missing_os in missing_os_names:
-                    print('Looking for suggestions for %s on %s' % (key, missing_os))
-                    try:
-                        suggestion = make_suggestion(self._config, key, missing_os)
-                    except SkipPlatform as e:
-                        msg = '\n::warning::' + str(e)
-                        if e.__cause__:
-                            msg += ': ' + str(e.__cause__)
-                        print(msg, file=sys.stderr)
-                        continue
-                    if suggestion:
-                        suggestion_url = get_package_link(
-                            self._config, suggestion, missing_os,
-                            self._config['supported_versions'][missing_os][-1],
-                            self._config['supported_arches'][missing_os][0])
-                        print(
-                            '\n::warning file=%s,line=%d::'
-                            "Key '%s' might be satisfied by %s package named '%s': %s" % (
-                                path, key.__line__, key, missing_os, suggestion.binary_name,
-                                suggestion_url),
-                            file=sys.stderr)
+                for missing_os in sorted(missing_os_names):
+                    queries.append((path, key, missing_os))
+
+        # Suggestions are made concurrently, and reported in order once all
+        # of them are done
+        results = make_suggestion_batch(
+            self._config, ((key, missing_os) for _, key, missing_os in queries))
+        current_path = None
+        for (path, _, _), (key, missing_os, suggestion, messages) in zip(queries, results):
+            if path != current_path:
+                print("Looking for name-based suggestions in '%s':" % path)
+                current_path = path
+            print('Looking for suggestions for %s on %s' % (key, missing_os))
+            for message in messages:
+                print(message)
+            if isinstance(suggestion, SkipPlatform):
+                msg = '\n::warning::' + str(suggestion)
+                if suggestion.__cause__:
+                    msg += ': ' + str(suggestion.__cause__)
+                print(msg, file=sys.stderr)
+            elif suggestion:
+                suggestion_url = get_package_link(
+                    self._config, suggestion, missing_os,
+                    self._config['supported_versions'][missing_os][-1],
+                    self._config['supported_arches'][missing_os][0])
+                print(
+                    '\n::warning file=%s,line=%d::'
+                    "Key '%s' might be satisfied by %s package named '%s': %s" % (
+                        path, key.__line__, key, missing_os, suggestion.binary_name,
+                        suggestion_url),
+                    file=sys.stderr)
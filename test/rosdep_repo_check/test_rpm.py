@@ -0,0 +1,145 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import gzip
+import io
+from xml.parsers import expat
+
+import pytest
+
+from .benchmark import generate_primary_xml
+from .rpm import parse_primary_xml
+
+_BASE_URL = 'http://example.com/fedora/40/x86_64/'
+
+# Packages which exercise the less common parts of the metadata
+_PRIMARY_XML = b'''<?xml version="1.0" encoding="UTF-8"?>
+<metadata xmlns="http://linux.duke.edu/metadata/common"
+          xmlns:rpm="http://linux.duke.edu/metadata/rpm" packages="4">
+<package type="rpm">
+  <name>epoch-pkg</name>
+  <version epoch="2" ver="1.0" rel="3.fc40"/>
+  <location href="Packages/e/epoch-pkg-1.0-3.fc40.x86_64.rpm"/>
+  <format>
+    <rpm:sourcerpm>epoch-src-1.0-3.fc40.src.rpm</rpm:sourcerpm>
+    <rpm:provides>
+      <rpm:entry name="epoch-pkg" flags="EQ" epoch="2" ver="1.0" rel="3.fc40"/>
+      <rpm:entry name="epoch-virtual"/>
+      <rpm:entry name="ge-virtual" flags="GE" epoch="0" ver="1.0"/>
+      <rpm:entry name="no-rel" flags="EQ" epoch="0" ver="4.5"/>
+    </rpm:provides>
+    <rpm:requires>
+      <rpm:entry name="not-provided"/>
+    </rpm:requires>
+  </format>
+</package>
+<package type="src">
+  <name>source-only</name>
+  <version epoch="0" ver="1.0" rel="1"/>
+  <location href="SRPMS/source-only-1.0-1.src.rpm"/>
+</package>
+<package type="rpm">
+  <name>no-source&amp;co</name>
+  <version epoch="0" ver="0.1"/>
+  <location href="Packages/n/no-source-0.1.x86_64.rpm"/>
+  <format>
+    <rpm:sourcerpm></rpm:sourcerpm>
+  </format>
+</package>
+<package type="rpm">
+  <name>caf\xc3\xa9</name>
+  <version epoch="0" ver="1" rel="1"/>
+  <location href="Packages/c/caf\xc3\xa9-1-1.noarch.rpm"/>
+  <format>
+    <rpm:sourcerpm>caf\xc3\xa9-1-1.src.rpm</rpm:sourcerpm>
+  </format>
+</package>
+</metadata>
+'''
+
+
+_EPOCH_URL = _BASE_URL + 'Packages/e/epoch-pkg-1.0-3.fc40.x86_64.rpm'
+
+_EXPECTED = [
+    ('epoch-pkg', '2:1.0-3.fc40', _EPOCH_URL, 'epoch-src', 'epoch-pkg'),
+    ('epoch-pkg', '2:1.0-3.fc40', _EPOCH_URL, 'epoch-src', 'epoch-pkg'),
+    ('epoch-virtual', None, _EPOCH_URL, 'epoch-src', 'epoch-pkg'),
+    ('ge-virtual', None, _EPOCH_URL, 'epoch-src', 'epoch-pkg'),
+    ('no-rel', '4.5', _EPOCH_URL, 'epoch-src', 'epoch-pkg'),
+    ('no-source&co', '0.1',
+     _BASE_URL + 'Packages/n/no-source-0.1.x86_64.rpm',
+     'no-source&co', 'no-source&co'),
+    ('caf\xe9', '1-1', _BASE_URL + 'Packages/c/caf\xe9-1-1.noarch.rpm',
+     'caf\xe9', 'caf\xe9'),
+]
+
+
+def _fields(entries):
+    return [
+        (pkg.name, pkg.version, pkg.url, pkg.source_name, pkg.binary_name)
+        for pkg in entries]
+
+
+def test_parse_primary_xml(chunk_size):
+    assert _fields(parse_primary_xml(
+        io.BytesIO(_PRIMARY_XML), _BASE_URL, chunk_size)) == _EXPECTED
+
+
+def test_parse_primary_xml_split(split_streams):
+    for f in split_streams(_PRIMARY_XML):
+        assert _fields(parse_primary_xml(f, _BASE_URL)) == _EXPECTED
+
+
+def test_parse_primary_xml_empty():
+    data = (
+        b'<metadata xmlns="http://linux.duke.edu/metadata/common" '
+        b'packages="0"/>')
+    assert list(parse_primary_xml(io.BytesIO(data), _BASE_URL)) == []
+
+
+@pytest.mark.parametrize('data', (
+    b'',
+    _PRIMARY_XML[:_PRIMARY_XML.index(b'</package>')],
+    _PRIMARY_XML.replace(b'</name>', b'</nam>', 1),
+))
+def test_parse_primary_xml_malformed(data):
+    with pytest.raises(expat.ExpatError):
+        list(parse_primary_xml(io.BytesIO(data), _BASE_URL))
+
+
+def test_parse_primary_xml_generated():
+    data = gzip.decompress(generate_primary_xml(200))
+    entries = _fields(parse_primary_xml(io.BytesIO(data), _BASE_URL))
+    # Each package provides itself and three other names
+    assert len(entries) == 800
+    url = _BASE_URL + 'Packages/l/lib7-devel-1.0.7-1.fc40.x86_64.rpm'
+    assert entries[28:32] == [
+        ('lib7-devel', '1.0.7-1.fc40', url, 'src1', 'lib7-devel'),
+        ('lib7-devel', '1.0.7-1.fc40', url, 'src1', 'lib7-devel'),
+        ('lib7-devel(x86-64)', '1.0.7-1.fc40', url, 'src1', 'lib7-devel'),
+        ('pkgconfig(lib7)', '1.0.7', url, 'src1', 'lib7-devel'),
+    ]
@@ -0,0 +1,100 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import random
+
+from .benchmark import generate_package_entries
+from .search import _trigrams
+from .search import TrigramIndex
+
+
+def _search_brute_force(names, query, limit):
+    query_trigrams = _trigrams(query)
+    results = []
+    for name_id, name in enumerate(names):
+        trigrams = _trigrams(name)
+        shared = len(query_trigrams & trigrams)
+        if shared:
+            similarity = shared / (
+                len(query_trigrams) + len(trigrams) - shared)
+            results.append((-similarity, name_id))
+    results.sort()
+    return [(-similarity, names[name_id])
+            for similarity, name_id in results[:limit]]
+
+
+def _substitute(rng, name):
+    pos = rng.randrange(len(name))
+    return name[:pos] + rng.choice('abcdefghijklmnopqrstuvwxyz') + \
+        name[pos + 1:]
+
+
+def test_search_small_index():
+    names = [
+        'libyaml-cpp-dev', 'libyaml-dev', 'yaml-cpp', 'python3-yaml',
+        'libfoo', 'foo', 'bar', 'libyaml-cpp0.7']
+    index = TrigramIndex(names)
+    for query in ('libyaml-cpp', 'yaml', 'libfoo-dev', 'baz', 'qux'):
+        for limit in (1, 3, 10):
+            assert index.search(query, limit) == \
+                _search_brute_force(names, query, limit)
+    assert [name for _, name in index.search('libyaml-cpp', 2)] == [
+        'libyaml-cpp0.7', 'libyaml-cpp-dev']
+
+
+def test_search_generated_names():
+    names = sorted({
+        pkg.name for pkg in generate_package_entries(5000)})
+    index = TrigramIndex(names)
+    rng = random.Random(0)
+    for _ in range(50):
+        query = _substitute(rng, rng.choice(names))
+        assert index.search(query) == _search_brute_force(names, query, 10)
+
+
+def test_search_random_names():
+    rng = random.Random(0)
+    words = (
+        'lib', 'python3-', 'ros-', 'yaml', 'cpp', 'boost', 'qt5', 'gl',
+        'x11', '-dev', '-doc', 'a', 'b', 'z', '0', '1')
+    names = list({
+        ''.join(rng.choice(words) for _ in range(rng.randint(1, 5)))
+        for _ in range(2000)})
+    index = TrigramIndex(names)
+    for _ in range(100):
+        query = ''.join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+        if rng.random() < 0.5:
+            query = _substitute(rng, query)
+        limit = rng.choice((1, 5, 10, 50))
+        assert index.search(query, limit) == \
+            _search_brute_force(names, query, limit)
+
+
+def test_search_duplicate_names():
+    index = TrigramIndex(['foo', 'foo', 'food'])
+    assert len(index) == 2
+    assert [name for _, name in index.search('foo')] == ['foo', 'food']
@@ -0,0 +1,105 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import threading
+
+import pytest
+
+from .session import HTTPSession
+
+
+_BODY = b'x' * (1024 * 1024)
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(_BODY)))
+        self.end_headers()
+        self.wfile.write(_BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:%d/' % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def _open_in_thread(session, url):
+    result = []
+    thread = threading.Thread(
+        target=lambda: result.append(session.open(url, {}, 10)), daemon=True)
+    thread.start()
+    return thread, result
+
+
+def test_slot_is_held_until_consumed(server_url):
+    session = HTTPSession(max_connections=1)
+    f = session.open(server_url, {}, 10)
+    thread, result = _open_in_thread(session, server_url)
+    thread.join(0.5)
+    assert thread.is_alive()
+    assert f.read() == _BODY
+    thread.join(10)
+    assert not thread.is_alive()
+    assert result[0].read() == _BODY
+    result[0].close()
+
+
+def test_slot_is_released_on_close(server_url):
+    session = HTTPSession(max_connections=1)
+    f = session.open(server_url, {}, 10)
+    assert f.read(10) == _BODY[:10]
+    f.close()
+    # The partially read connection must not be re-used
+    with session.open(server_url, {}, 10) as f:
+        assert f.read() == _BODY
+
+
+def test_slot_is_released_when_abandoned(server_url):
+    session = HTTPSession(max_connections=1)
+    f = session.open(server_url, {}, 10)
+    f.read(10)
+    del f
+    thread, result = _open_in_thread(session, server_url)
+    thread.join(10)
+    assert not thread.is_alive()
+    assert result[0].read() == _BODY
+    result[0].close()
@@ -0,0 +1,97 @@
+# Copyright (c) 2026, Open Source Robotics Foundation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import time
+
+from . import PackageEntry
+from . import PackageTable
+from .benchmark import generate_package_entries
+from .snapshot import load_snapshot
+from .snapshot import Snapshot
+from .snapshot import write_snapshot
+
+
+def _fields(pkg):
+    return (
+        pkg.name, pkg.version, pkg.url, pkg.source_name, pkg.binary_name)
+
+
+def _make_table():
+    table = PackageTable()
+    for pkg in generate_package_entries(2000):
+        table.add(pkg)
+    for pkg in (
+        PackageEntry('libcafé-dev', '1.0', 'http://example.com/a.deb'),
+        PackageEntry('libz', None, None),
+        # A virtual package with the name of a binary package
+        PackageEntry(
+            'libsource1-0-dev', None, 'http://example.com/b.deb',
+            'other', 'other'),
+    ):
+        table.add(pkg)
+    return table
+
+
+def test_snapshot_lookup(tmp_path):
+    table = _make_table()
+    path = str(tmp_path / 'test.idx')
+    write_snapshot(path, table, {'key': 'test'})
+    snapshot = Snapshot(path)
+
+    assert len(snapshot) == len(table)
+    assert sorted(map(_fields, snapshot), key=repr) == \
+        sorted(map(_fields, table), key=repr)
+    assert snapshot.metadata == {'key': 'test'}
+
+    for pkg in table:
+        assert _fields(snapshot.lookup(pkg.name)) == \
+            _fields(table.get(pkg.name))
+    assert snapshot.lookup('libsource1-0-dev').binary_name == \
+        'libsource1-0-dev'
+    for name in ('', 'a', 'lib', 'libsource1-0-de', 'libsource1-0-devv',
+                 'libcaf', 'libz-dev', 'zzz'):
+        assert snapshot.lookup(name) is None, name
+
+
+def test_load_snapshot(tmp_path):
+    path = str(tmp_path / 'test.idx')
+    assert load_snapshot(path, 'test', 3600) is None
+
+    write_snapshot(path, _make_table(), {
+        'key': 'test',
+        'sources': [['http://example.com/Packages', time.time()]],
+        'validator': 'sha256 1234',
+    })
+    assert load_snapshot(path, 'test', 3600) is not None
+    assert load_snapshot(path, 'other', 3600) is None
+    assert load_snapshot(path, 'test', 0) is None
+    assert load_snapshot(path, 'test', 0, 'sha256 1234') is not None
+    assert load_snapshot(path, 'test', 3600, 'sha256 5678') is None
+
+    with open(path, 'r+b') as f:
+        f.write(b'INVALID!')
+    assert load_snapshot(path, 'test', 3600) is None
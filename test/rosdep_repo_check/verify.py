@@ -25,13 +25,19 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+from concurrent.futures import ThreadPoolExecutor
 import sys
 
-from . import find_package
+from . import find_packages
+from . import get_sources
 from . import SkipPlatform
 
 
-def _verify_rules(config, key, os_name, os_rules, all_rules, include_found):
+DEFAULT_PREFETCH_JOBS = 8
+"""The default number of repositories to download and parse concurrently."""
+
+
+def _enumerate_queries(config, key, os_name, os_rules, all_rules):
     if os_name not in config['package_sources']:
         return
     packages_to_check = {}
@@ -39,7 +45,7 @@ def _verify_rules(config, key, os_name, os_rules, all_rules, include_found):
         for os_ver in config['supported_versions'].get(os_name, ()):
             packages_to_check[os_ver] = os_rules
     else:
-        packages_to_check = os_rules
+        packages_to_check = dict(os_rules)
         if '*' in os_rules:
             for os_ver in config['supported_versions'].get(os_name, ()):
                 if os_ver not in all_rules[key][os_name]:
@@ -60,12 +66,69 @@ def _verify_rules(config, key, os_name, os_rules, all_rules, include_found):
                     os_name, {}).get(os_ver, {}).items():
                 package = package.replace(needle, haystack)
             for os_arch in config['supported_arches'][os_name]:
-                res = find_package(config, package, os_name, os_ver, os_arch)
-                if not res or include_found:
-                    yield (os_name, os_ver, os_arch, key, package, res)
+                yield (os_ver, os_arch, package)
 
 
-def verify_rules(config, rules_to_check, all_rules, include_found=False):
+def plan_queries(config, rules_to_check, all_rules):
+    """
+    Normalize rosdep rules into the unique package queries needed to check them.
+
+    Wildcards are expanded to each supported version and name replacements are
+    applied, so a package which is referenced by several keys, versions or
+    rules is only queried once for each platform.
+
+    :param config: the parsed YAML configuration.
+    :param rules_to_check: rosdep rules to be checked.
+    :param all_rules: full rosdep rules to check for individual version rules.
+
+    :returns: a tuple of:
+        - a list of tuples of rosdep key, OS name and the list of OS version,
+          OS architecture and package name tuples to check for that key
+        - a mapping of OS name, OS version and architecture tuples to the
+          set of package names to query for that platform
+    """
+    rule_queries = []
+    needles = {}
+    for key, rules in rules_to_check.items():
+        for os_name, os_rules in rules.items():
+            queries = list(_enumerate_queries(
+                config, key, os_name, os_rules, all_rules))
+            rule_queries.append((key, os_name, queries))
+            for os_ver, os_arch, package in queries:
+                needles.setdefault(
+                    (os_name, os_ver, os_arch), set()).add(package)
+    return rule_queries, needles
+
+
+def prefetch_repositories(config, platforms, jobs=DEFAULT_PREFETCH_JOBS):
+    """
+    Download and parse the repositories for the given platforms concurrently.
+
+    Any errors encountered while enumerating a repository are deferred until
+    the repository is used to look up a package.
+
+    :param config: the parsed YAML configuration.
+    :param platforms: tuples of OS name, OS version and architecture.
+    :param jobs: the maximum number of repositories to process concurrently.
+    """
+    caches = []
+    for os_name, os_code_name, os_arch in sorted(platforms):
+        # The sources are looked up again to verify the platform, which is
+        # when any missing sources are reported
+        for source in get_sources(
+                config, os_name, os_code_name, warn=False):
+            caches.append(
+                source.enumerate_packages(os_name, os_code_name, os_arch))
+    if not caches:
+        return
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for cache in caches:
+            executor.submit(cache.prefetch)
+
+
+def verify_rules(
+    config, rules_to_check, all_rules, include_found=False, platforms=None,
+):
     """
     Verify rosdep rules for supported platforms.
 
@@ -76,6 +139,8 @@ def verify_rules(config, rules_to_check, all_rules, include_found=False):
     :param rules_to_check: rosdep rules to be checked.
     :param all_rules: full rosdep rules to check for individual version rules.
     :param include_found: in addition to missing rules, also yield those found.
+    :param platforms: if given, only the rules for these tuples of OS name, OS
+      version and architecture are verified.
 
     :returns: a tuple of:
         - OS name
@@ -85,13 +150,32 @@ def verify_rules(config, rules_to_check, all_rules, include_found=False):
         - package name
         - corresponding package entry, if found
     """
-    for key, rules in rules_to_check.items():
-        for os_name, os_rules in rules.items():
-            try:
-                yield from _verify_rules(
-                    config, key, os_name, os_rules, all_rules, include_found)
-            except SkipPlatform as e:
+    rule_queries, needles = plan_queries(config, rules_to_check, all_rules)
+    if platforms is not None:
+        needles = {
+            platform: names for platform, names in needles.items()
+            if platform in platforms}
+    prefetch_repositories(config, needles.keys())
+
+    found = {}
+    skipped = {}
+    for platform, names in sorted(needles.items()):
+        try:
+            found[platform] = find_packages(config, names, *platform)
+        except SkipPlatform as e:
+            skipped[platform] = e
+
+    for key, os_name, queries in rule_queries:
+        for os_ver, os_arch, package in queries:
+            platform = (os_name, os_ver, os_arch)
+            if platform in skipped:
+                e = skipped.pop(platform)
                 msg = '\n::warning::' + str(e)
                 if e.__cause__:
                     msg += ': ' + str(e.__cause__)
                 print(msg, file=sys.stderr)
+            if platform not in found:
+                continue
+            res = found[platform].get(package)
+            if not res or include_found:
+                yield (os_name, os_ver, os_arch, key, package, res)